@@ -0,0 +1,134 @@
+"""
+Reenvia updates capturados do Telegram para o webhook do bot e mede a vazão.
+
+Uso (com o bot rodando em BOT_MODE=webhook e, de preferência, TELEGRAM_OFFLINE=1):
+
+    python -m app.replay_updates updates.jsonl --url http://127.0.0.1:8443/telegram \\
+        --secret $WEBHOOK_SECRET_TOKEN --concurrency 50 --repeat 10 --wait-drain
+
+O arquivo pode ser um JSON com uma lista de updates ou um JSONL (um update por linha).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    """Lê os updates de um arquivo JSON (lista) ou JSONL."""
+    with open(path, encoding="utf-8") as f:
+        content = f.read().strip()
+    if content.startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _wait_drain(session: aiohttp.ClientSession, health_url: str, timeout: float) -> Optional[float]:
+    """Espera a fila de updates do bot esvaziar; retorna o tempo de espera ou None se esgotar."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        async with session.get(health_url) as response:
+            health = await response.json()
+        processing = health.get("processing", {}).get("pending_updates", 0)
+        if health.get("pending_updates", 0) == 0 and processing == 0:
+            return time.perf_counter() - started
+        await asyncio.sleep(0.05)
+    return None
+
+
+async def replay(
+    updates: List[Dict[str, Any]],
+    url: str,
+    secret: Optional[str],
+    concurrency: int,
+    repeat: int,
+    health_url: Optional[str],
+    drain_timeout: float,
+) -> None:
+    headers = {SECRET_TOKEN_HEADER: secret} if secret else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    status_counts: Dict[int, int] = {}
+    next_update_id = 1
+
+    async with aiohttp.ClientSession() as session:
+        async def send(update: Dict[str, Any]) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with session.post(url, json=update, headers=headers) as response:
+                        await response.read()
+                        status = response.status
+                except aiohttp.ClientError:
+                    status = 0 # Falha de conexão
+                latencies.append(time.perf_counter() - started)
+                status_counts[status] = status_counts.get(status, 0) + 1
+
+        batch = []
+        for _ in range(repeat):
+            for update in updates:
+                # update_id único por envio, como o Telegram faria
+                batch.append({**update, "update_id": next_update_id})
+                next_update_id += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(update) for update in batch))
+        elapsed = time.perf_counter() - started
+
+        drain_time = None
+        if health_url:
+            drain_time = await _wait_drain(session, health_url, drain_timeout)
+
+    print(f"Updates enviados:      {len(batch)} (concorrência {concurrency})")
+    print(f"Status HTTP:           {dict(sorted(status_counts.items()))}")
+    print(f"Tempo de envio:        {elapsed:.3f}s ({len(batch) / elapsed:.1f} updates/s aceitos)")
+    print(
+        f"Latência do webhook:   p50 {_percentile(latencies, 50) * 1000:.1f}ms | "
+        f"p95 {_percentile(latencies, 95) * 1000:.1f}ms | p99 {_percentile(latencies, 99) * 1000:.1f}ms | "
+        f"média {statistics.mean(latencies) * 1000:.1f}ms"
+    )
+    if health_url:
+        if drain_time is None:
+            print(f"Fila do bot não esvaziou em {drain_timeout}s.")
+        else:
+            total = elapsed + drain_time
+            print(f"Processamento total:   {total:.3f}s ({len(batch) / total:.1f} updates/s processados)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reenvia updates capturados para o webhook do bot.")
+    parser.add_argument("file", help="Arquivo JSON (lista) ou JSONL com updates do Telegram")
+    parser.add_argument("--url", default="http://127.0.0.1:8443/telegram", help="URL do webhook")
+    parser.add_argument("--secret", default=None, help="Secret token do webhook")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requisições simultâneas")
+    parser.add_argument("--repeat", type=int, default=1, help="Quantas vezes reenviar o arquivo")
+    parser.add_argument("--wait-drain", action="store_true", help="Espera o bot processar a fila (usa o /healthz)")
+    parser.add_argument("--health-url", default=None, help="URL do health check (padrão: mesma origem + /healthz)")
+    parser.add_argument("--drain-timeout", type=float, default=120.0, help="Tempo máximo esperando a fila esvaziar")
+    args = parser.parse_args()
+
+    health_url = None
+    if args.wait_drain:
+        health_url = args.health_url or urlsplit(args.url)._replace(path="/healthz", query="").geturl()
+
+    updates = load_updates(args.file)
+    asyncio.run(replay(updates, args.url, args.secret, args.concurrency, args.repeat, health_url, args.drain_timeout))
+
+
+if __name__ == "__main__":
+    main()
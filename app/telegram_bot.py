@@ -1,38 +1,280 @@
 import asyncio
-from config import settings # Garante que as configs sejam carregadas
-from config.settings import logger
+from typing import TYPE_CHECKING, Optional
 
-# Importações das implementações concretas e use case
-from infrastructure.chatbot.langchain_chatbot import LangchainChatbot
-from infrastructure.memory.in_memory_user_memory import InMemoryUserMemory
-from domain.use_cases.process_user_message import ProcessUserMessageUseCase
-from infrastructure.telegram.bot_setup import setup_application
+from config import settings
+from config.settings import Settings, logger
+from config.logging_setup import set_trace_id_getter, setup_logging
 
-def main() -> None:
-    """Ponto de entrada principal para iniciar o bot."""
-    logger.info("Iniciando o Bot Furia Telegram...")
+# Só módulos leves aqui: cada componente (Telegram, Langchain/Groq, SQLite,
+# base de conhecimento, servidor HTTP) é importado quando é criado, e o
+# tempo gasto entra no relatório de partida.
+from domain.gateways.chatbot_gateway import ChatbotGateway
+from infrastructure.observability.metrics import metrics
+from infrastructure.observability.startup_report import StartupReport
+
+if TYPE_CHECKING:
+    from telegram.ext import Application
+    from infrastructure.chatbot.history_compactor import HistoryCompactor
+
+
+def build_llm_gateway(
+    config: Settings,
+    llm=None,
+    startup_report: Optional[StartupReport] = None,
+    history_compactor: Optional["HistoryCompactor"] = None
+) -> ChatbotGateway:
+    """
+    Cria o acesso ao LLM: um LangchainChatbot ou, com vários modelos em
+    LLM_MODELS (ou uma lista de LLMs em `llm`), um PooledChatbot entre eles.
+
+    Com `history_compactor`, todos os backends compartilham esse compactador
+    (e o resumidor dele); senão o primeiro backend cria o seu.
+    """
+    startup_report = startup_report or StartupReport()
+    with startup_report.measure("llm", "import"):
+        from infrastructure.chatbot.langchain_chatbot import LangchainChatbot
+        from infrastructure.chatbot.pooled_chatbot import PooledChatbot
+
+    if isinstance(llm, (list, tuple)):
+        specs = [(f"llm{index}", backend_llm, None) for index, backend_llm in enumerate(llm)]
+    elif llm is not None:
+        specs = [("llm0", llm, None)]
+    else:
+        specs = [(model, None, model) for model in config.llm_models]
+
+    with startup_report.measure("llm", "init"):
+        if len(specs) == 1:
+            _, backend_llm, model_name = specs[0]
+            return LangchainChatbot(
+                llm=backend_llm,
+                model_name=model_name,
+                api_key=config.groq_api_key,
+                history_compactor=history_compactor
+            )
+
+        backends = []
+        for name, backend_llm, model_name in specs:
+            # Os backends propagam falhas (para o pool tentar outro) e compartilham o resumo das conversas
+            chatbot = LangchainChatbot(
+                llm=backend_llm,
+                model_name=model_name,
+                api_key=config.groq_api_key,
+                raise_errors=True,
+                history_compactor=history_compactor
+            )
+            history_compactor = chatbot.history_compactor
+            backends.append((name, chatbot))
+        pool = PooledChatbot(
+            backends,
+            window=settings.LLM_POOL_WINDOW,
+            error_rate_threshold=settings.LLM_POOL_ERROR_RATE_THRESHOLD,
+            max_consecutive_failures=settings.LLM_POOL_MAX_CONSECUTIVE_FAILURES,
+            open_seconds=settings.LLM_POOL_OPEN_SECONDS,
+            hedging=settings.LLM_POOL_HEDGING_ENABLED,
+            hedge_min_delay=settings.LLM_POOL_HEDGE_MIN_SECONDS,
+            explore_rate=settings.LLM_POOL_EXPLORE_RATE
+        )
+    metrics.register_collector("llm_pool", pool.get_stats)
+    return pool
+
+
+def build_application(
+    llm=None,
+    offline: Optional[bool] = None,
+    with_metrics_server: bool = True,
+    config: Optional[Settings] = None,
+    startup_report: Optional[StartupReport] = None
+) -> "Application":
+    """
+    Cria todas as dependências e a aplicação Telegram pronta para rodar.
+
+    Args:
+        llm: Modelo de chat a usar no lugar do ChatGroq (ex.: um modelo falso em benchmarks);
+            uma lista de modelos cria um pool entre eles. Com ele, GROQ_API_KEY não é exigida.
+        offline: Se True, a Bot API é respondida localmente; None usa config.telegram_offline.
+        with_metrics_server: Se False, não abre o endpoint HTTP de métricas (ex.: benchmarks).
+        config: Configurações do ambiente; None lê as variáveis de ambiente atuais.
+        startup_report: Onde registrar o custo de importação/inicialização de cada componente.
+    """
+    config = config or Settings.from_env()
+    offline = config.telegram_offline if offline is None else offline
+    config.validate(require_groq_key=llm is None, require_telegram_token=not offline)
+    startup_report = startup_report or StartupReport()
+    metrics.register_collector("startup", startup_report.get_stats)
+
+    metrics.trace_logging = config.trace_ids_enabled
+    # Anexa o trace ID da mensagem aos logs (campo "trace_id" no formato JSON)
+    set_trace_id_getter(metrics.current_trace_id if config.trace_ids_enabled else None)
+    metrics_server = None
+    if config.metrics_enabled and with_metrics_server:
+        with startup_report.measure("metrics_server", "import"):
+            from infrastructure.observability.metrics_server import MetricsServer
+        with startup_report.measure("metrics_server", "init"):
+            metrics_server = MetricsServer(metrics, listen=config.metrics_listen, port=config.metrics_port)
 
     # --- Criação das Dependências ---
-    try:
-        # 1. Criar Gateways
-        chatbot_gateway = LangchainChatbot()
-        memory_gateway = InMemoryUserMemory(max_history_size=10) # Limita o histórico
+    # 1. Criar Gateways
+    with startup_report.measure("llm", "import"):
+        from infrastructure.chatbot.history_compactor import HistoryCompactor
+    with startup_report.measure("llm", "init"):
+        # Resumo das conversas compartilhado pelos backends; o resumidor é ligado ao scheduler abaixo
+        history_compactor = HistoryCompactor(
+            max_history_tokens=settings.HISTORY_MAX_TOKENS,
+            summary_min_turns=settings.HISTORY_SUMMARY_MIN_TURNS,
+            max_users=settings.HISTORY_CACHE_MAX_USERS
+        )
+    chatbot_gateway = build_llm_gateway(config, llm, startup_report, history_compactor)
+    with startup_report.measure("llm_wrappers", "import"):
+        from infrastructure.chatbot.cached_chatbot import CachedChatbot
+        from infrastructure.chatbot.single_flight_chatbot import SingleFlightChatbot
+        from infrastructure.chatbot.scheduled_chatbot import ScheduledChatbot
+        from infrastructure.scheduler.llm_scheduler import LLMScheduler
+    with startup_report.measure("llm_wrappers", "init"):
+        # Limita as chamadas simultâneas ao Groq com uma fila justa entre usuários
+        llm_scheduler = LLMScheduler(
+            max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+            max_queue_size=settings.LLM_MAX_QUEUE_SIZE,
+            default_timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            max_background_in_flight=settings.LLM_MAX_BACKGROUND_IN_FLIGHT
+        )
+        chatbot_gateway = ScheduledChatbot(inner=chatbot_gateway, scheduler=llm_scheduler)
+        # Resumos passam pelo scheduler (prioridade baixa) e pelo pool, como as respostas
+        history_compactor.summarizer = chatbot_gateway.summarize_history
+        metrics.register_collector("llm_scheduler", llm_scheduler.get_stats)
+        if settings.SINGLE_FLIGHT_ENABLED:
+            # Requisições iguais e simultâneas compartilham uma única chamada ao LLM
+            chatbot_gateway = SingleFlightChatbot(inner=chatbot_gateway)
+            metrics.register_collector("single_flight", chatbot_gateway.get_stats)
+        if settings.RESPONSE_CACHE_ENABLED:
+            # Cache na frente do LLM para perguntas repetidas
+            chatbot_gateway = CachedChatbot(
+                inner=chatbot_gateway,
+                ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+                similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY_THRESHOLD
+            )
+            metrics.register_collector("response_cache", chatbot_gateway.get_stats)
+
+    with startup_report.measure("memory", "import"):
+        from infrastructure.observability.instrumented_memory import InstrumentedMemoryGateway
+        if config.memory_backend == "sqlite":
+            from infrastructure.memory.sqlite_user_memory import SqliteUserMemory
+        else:
+            from infrastructure.memory.in_memory_user_memory import InMemoryUserMemory
+    with startup_report.measure("memory", "init"):
+        if config.memory_backend == "sqlite":
+            # Memória persistente, compartilhável entre processos
+            memory_gateway = SqliteUserMemory(
+                directory=config.sqlite_memory_dir,
+                shards=settings.SQLITE_MEMORY_SHARDS,
+                max_history_size=settings.MEMORY_MAX_HISTORY_SIZE,
+                hot_users=settings.SQLITE_MEMORY_HOT_USERS,
+                flush_interval=settings.SQLITE_MEMORY_FLUSH_INTERVAL_SECONDS,
+                flush_batch_size=settings.SQLITE_MEMORY_FLUSH_BATCH_SIZE
+            )
+        else:
+            memory_gateway = InMemoryUserMemory(
+                max_history_size=settings.MEMORY_MAX_HISTORY_SIZE, # Limita o histórico
+                idle_ttl_seconds=settings.MEMORY_IDLE_TTL_SECONDS,
+                max_total_bytes=settings.MEMORY_MAX_TOTAL_BYTES
+            )
+        # Mede a duração das leituras/gravações de histórico
+        memory_gateway = InstrumentedMemoryGateway(memory_gateway, metrics)
+        metrics.register_collector("memory", memory_gateway.get_stats)
+
+    # 2. Índice de intenções dos comandos predefinidos (montado uma vez)
+    with startup_report.measure("intent_index", "import"):
+        from domain.intent_index import IntentIndex
+    with startup_report.measure("intent_index", "init"):
+        intent_index = IntentIndex.from_commands(
+            settings.PREDEFINED_COMMANDS,
+            settings.PREDEFINED_COMMAND_PARAPHRASES,
+            threshold=settings.INTENT_MATCH_THRESHOLD
+        )
+    logger.info(f"Índice de intenções criado com {len(intent_index)} frases.")
+
+    # 3. Base de conhecimento indexada (BM25), recarregada quando os arquivos mudam
+    knowledge_base = None
+    if settings.KNOWLEDGE_BASE_ENABLED:
+        with startup_report.measure("knowledge_base", "import"):
+            from infrastructure.knowledge.file_knowledge_base import FileKnowledgeBase
+        with startup_report.measure("knowledge_base", "init"):
+            knowledge_base = FileKnowledgeBase(
+                directory=config.knowledge_base_dir,
+                reload_interval=settings.KNOWLEDGE_BASE_RELOAD_SECONDS
+            )
+        metrics.register_collector("knowledge_base", knowledge_base.get_stats)
 
-        # 2. Criar Use Case injetando os Gateways
+    # 4. Criar Use Case injetando os Gateways
+    with startup_report.measure("use_case", "import"):
+        from domain.use_cases.process_user_message import ProcessUserMessageUseCase
+    with startup_report.measure("use_case", "init"):
         process_message_use_case = ProcessUserMessageUseCase(
             chatbot_gateway=chatbot_gateway,
-            memory_gateway=memory_gateway
+            memory_gateway=memory_gateway,
+            intent_index=intent_index,
+            knowledge_base=knowledge_base
         )
+    # Comandos predefinidos/paráfrases respondidos direto x chamadas ao LLM
+    metrics.register_collector("messages", process_message_use_case.get_stats)
 
-        # 3. Configurar a Aplicação Telegram injetando o Use Case e Memory
+    # 5. Configurar a Aplicação Telegram injetando o Use Case e Memory
+    with startup_report.measure("telegram", "import"):
+        from infrastructure.telegram.bot_setup import setup_application
+    with startup_report.measure("telegram", "init"):
         application = setup_application(
             process_message_use_case=process_message_use_case,
-            memory_gateway=memory_gateway # Passa a memória para /start
+            memory_gateway=memory_gateway, # Passa a memória para /start
+            knowledge_base=knowledge_base,
+            history_compactor=history_compactor,
+            offline=offline,
+            metrics_server=metrics_server,
+            token=config.telegram_bot_token,
+            startup_report=startup_report
         )
+    return application
+
+
+def main() -> None:
+    """Ponto de entrada principal para iniciar o bot."""
+    startup_report = StartupReport()
+    try:
+        with startup_report.measure("config", "init"):
+            config = settings.load_settings()
+        with startup_report.measure("logging", "init"):
+            # Logs escritos por uma thread em segundo plano (não bloqueiam o event loop)
+            setup_logging(
+                level=config.log_level,
+                json_format=config.log_format == "json",
+                sample_rates=config.log_sample_rates
+            )
+        logger.info("Iniciando o Bot Furia Telegram...")
+
+        application = build_application(config=config, startup_report=startup_report)
 
         # --- Iniciar o Bot ---
-        logger.info("Iniciando polling do Telegram...")
-        application.run_polling()
+        if config.bot_mode == "webhook":
+            logger.info("Iniciando em modo webhook...")
+            with startup_report.measure("webhook_server", "import"):
+                from infrastructure.telegram.webhook_server import WebhookServer, run_webhook
+            server = WebhookServer(
+                application,
+                listen=config.webhook_listen,
+                port=config.webhook_port,
+                url_path=config.webhook_path,
+                secret_token=config.webhook_secret_token,
+                health_path=settings.WEBHOOK_HEALTH_PATH
+            )
+            asyncio.run(run_webhook(
+                application,
+                server,
+                webhook_url=config.webhook_url,
+                secret_token=config.webhook_secret_token
+            ))
+        else:
+            logger.info("Iniciando polling do Telegram...")
+            application.run_polling()
 
     except ValueError as e:
         logger.error(f"Erro de configuração: {e}")
@@ -45,4 +287,4 @@ if __name__ == "__main__":
     # Embora run_polling seja síncrono, as funções internas podem precisar do loop asyncio
     # Se usar run_async, o asyncio.run() seria mais explícito.
     # Para run_polling, chamar main() diretamente geralmente funciona.
-     main()
\ No newline at end of file
+     main()
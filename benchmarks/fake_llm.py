@@ -0,0 +1,79 @@
+import asyncio
+import random
+from typing import AsyncIterator, List, Optional
+
+
+class FakeMessage:
+    """Resposta do modelo falso (mesmo atributo `content` das mensagens do Langchain)."""
+
+    __slots__ = ("content",)
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeLLMError(RuntimeError):
+    """Erro simulado do provedor de LLM."""
+
+
+class FakeChatModel:
+    """
+    Modelo de chat local que imita o ChatGroq para testes de carga.
+
+    A latência de cada chamada segue uma distribuição log-normal
+    (mediana `latency_median` e dispersão `latency_sigma`) e uma fração
+    `error_rate` das chamadas falha. O streaming entrega a resposta
+    palavra por palavra, distribuindo a latência entre os tokens após
+    o tempo até o primeiro token.
+    """
+
+    def __init__(
+        self,
+        latency_median: float = 0.8,
+        latency_sigma: float = 0.4,
+        error_rate: float = 0.0,
+        first_token_fraction: float = 0.3,
+        response_words: int = 40,
+        seed: Optional[int] = None,
+    ):
+        self._latency_median = latency_median
+        self._latency_sigma = latency_sigma
+        self._error_rate = error_rate
+        self._first_token_fraction = first_token_fraction
+        self._response_words = response_words
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    async def ainvoke(self, messages: List[object], **kwargs) -> FakeMessage:
+        latency = self._next_latency()
+        self.calls += 1
+        await asyncio.sleep(latency)
+        self._maybe_fail()
+        return FakeMessage(" ".join(self._words(messages)))
+
+    async def astream(self, messages: List[object], **kwargs) -> AsyncIterator[FakeMessage]:
+        latency = self._next_latency()
+        self.calls += 1
+        await asyncio.sleep(latency * self._first_token_fraction)
+        self._maybe_fail()
+        words = self._words(messages)
+        per_token = latency * (1 - self._first_token_fraction) / max(1, len(words))
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(per_token)
+            yield FakeMessage(word if index == 0 else " " + word)
+
+    def _next_latency(self) -> float:
+        if self._latency_median <= 0:
+            return 0.0
+        return self._random.lognormvariate(0.0, self._latency_sigma) * self._latency_median
+
+    def _maybe_fail(self) -> None:
+        if self._error_rate > 0 and self._random.random() < self._error_rate:
+            self.errors += 1
+            raise FakeLLMError("Erro simulado do LLM")
+
+    def _words(self, messages: List[object]) -> List[str]:
+        last = getattr(messages[-1], "content", "") if messages else ""
+        return ["FURIA", "🐾"] + [f"resposta{i}" for i in range(self._response_words - 3)] + [f"({len(last)})"]
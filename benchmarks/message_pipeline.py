@@ -0,0 +1,331 @@
+"""
+Benchmark offline do caminho de uma mensagem:
+handle_message -> ProcessUserMessageUseCase.execute -> LangchainChatbot / memória.
+
+Usa os handlers e a fiação reais do bot, com:
+  - um LLM local falso (latência e taxa de erro configuráveis);
+  - um cliente da Bot API offline, que registra as chamadas sem acessar o Telegram.
+
+Exemplos:
+    python -m benchmarks.message_pipeline
+    python -m benchmarks.message_pipeline --users 10,100,1000 --history 0,10 --messages 5
+    python -m benchmarks.message_pipeline --users 10,100,1000 --history 0,10 --messages 5 --save-baseline  # grava benchmarks/baseline.json
+    python -m benchmarks.message_pipeline --tolerance 0.2      # compara com o baseline (falha se regredir)
+    python -m benchmarks.message_pipeline --backend-latencies 0.8,3.0 --backend-error-rates 0,0.3  # pool de LLMs
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram import Update
+
+# Sem chaves reais: com o LLM falso e o modo offline, GROQ_API_KEY e TELEGRAM_BOT_TOKEN não são exigidas
+from config import settings
+from config.logging_setup import setup_logging
+from app.telegram_bot import build_application
+from benchmarks.fake_llm import FakeChatModel
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Mistura de mensagens: comandos/paráfrases, perguntas frequentes e perguntas únicas
+_COMMAND_MESSAGES = ["Próximos jogos", "quem são os jogadores", "Curiosidades", "frases da torcida", "quando a furia joga?"]
+_FREQUENT_QUESTIONS = [
+    "quem ganhou o último jogo da furia?",
+    "qual é o mapa favorito da furia?",
+    "o fallen ainda joga pela furia?",
+    "onde posso assistir os jogos da furia?",
+    "qual foi o melhor resultado da furia em major?",
+    "quem é o capitão da furia?",
+]
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _is_error_reply(method: str, parameters: Dict[str, Any]) -> bool:
+    """
+    Resposta que o usuário recebeu no lugar da resposta certa: falha ou recusa
+    do LLM, exceção nos handlers ou streaming interrompido. O aviso de
+    interrupção só aparece no último envio/edição da mensagem.
+    """
+    if method not in ("sendMessage", "editMessageText"):
+        return False
+    text = parameters.get("text") or ""
+    if text.endswith(settings.LLM_STREAM_INTERRUPTED_MESSAGE):
+        return True
+    return method == "sendMessage" and text in (
+        settings.LLM_ERROR_MESSAGE, settings.LLM_BUSY_MESSAGE, settings.LLM_TIMEOUT_MESSAGE,
+        settings.UNEXPECTED_ERROR_MESSAGE, settings.INTERNAL_ERROR_MESSAGE
+    )
+
+
+def _current_rss_bytes() -> int:
+    """RSS atual do processo (Linux); em outros sistemas, o pico (ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _make_update(update_id: int, user_id: int, text: str, bot) -> Update:
+    user = {"id": user_id, "is_bot": False, "first_name": f"Fã {user_id}"}
+    data = {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": text,
+        },
+    }
+    return Update.de_json(data, bot)
+
+
+def _pick_message(rng: random.Random, user_id: int, index: int) -> str:
+    roll = rng.random()
+    if roll < 0.25:
+        return rng.choice(_COMMAND_MESSAGES)
+    if roll < 0.5:
+        return rng.choice(_FREQUENT_QUESTIONS)
+    return f"o que você achou da jogada {user_id}-{index} do yuurih no último mapa?"
+
+
+async def run_scenario(
+    users: int,
+    history_size: int,
+    messages_per_user: int,
+    llm_options: Dict[str, Any],
+    seed: int,
+    trace_memory: bool,
+    backends: Optional[List[Dict[str, float]]] = None,
+) -> Dict[str, Any]:
+    """
+    Roda um cenário (N usuários com histórico H) e retorna as métricas.
+    Com `backends` (opções de latência/erro por backend), o LLM é um pool de modelos falsos.
+    """
+    rng = random.Random(seed)
+    settings.MEMORY_MAX_HISTORY_SIZE = max(settings.MEMORY_MAX_HISTORY_SIZE, history_size)
+    if backends:
+        fake_llms = [FakeChatModel(seed=seed + index, **{**llm_options, **options}) for index, options in enumerate(backends)]
+        application = build_application(llm=fake_llms, offline=True, with_metrics_server=False)
+    else:
+        fake_llms = [FakeChatModel(seed=seed, **llm_options)]
+        application = build_application(llm=fake_llms[0], offline=True, with_metrics_server=False)
+    latencies: List[float] = []
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        memory_gateway = application.bot_data["memory_gateway"]
+        processor = application.update_processor
+        bot = application.bot
+
+        # Histórico pré-existente de cada usuário
+        for user_id in range(1, users + 1):
+            for turn in range(history_size):
+                await memory_gateway.add_interaction(
+                    user_id, f"pergunta antiga {turn} sobre a FURIA", f"resposta antiga {turn} 🐾🔥 " * 5
+                )
+
+        if trace_memory:
+            tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0] if trace_memory else _current_rss_bytes()
+
+        next_update_id = 1
+
+        async def user_session(user_id: int) -> None:
+            nonlocal next_update_id
+            for index in range(messages_per_user):
+                update = _make_update(next_update_id, user_id, _pick_message(rng, user_id, index), bot)
+                next_update_id += 1
+                started = time.perf_counter()
+                await processor.process_update(update, application.process_update(update))
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user_session(user_id) for user_id in range(1, users + 1)))
+        elapsed = time.perf_counter() - started
+
+        memory_after = tracemalloc.get_traced_memory()[0] if trace_memory else _current_rss_bytes()
+        if trace_memory:
+            tracemalloc.stop()
+
+        api_calls = dict(bot.request.call_counts)
+        error_replies = sum(1 for method, parameters, _ in bot.request.calls if _is_error_reply(method, parameters))
+        use_case_stats = application.bot_data["process_message_use_case"].get_stats()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+    total_messages = len(latencies)
+    return {
+        "users": users,
+        "history_size": history_size,
+        "messages": total_messages,
+        "elapsed_s": round(elapsed, 4),
+        "messages_per_s": round(total_messages / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+        "memory_growth_bytes": memory_after - memory_before,
+        "llm_calls": sum(fake_llm.calls for fake_llm in fake_llms),
+        "llm_errors": sum(fake_llm.errors for fake_llm in fake_llms),
+        "llm_calls_per_backend": [fake_llm.calls for fake_llm in fake_llms],
+        "error_replies": error_replies,
+        "llm_calls_avoided": use_case_stats["llm_calls_avoided"],
+        "api_calls": api_calls,
+    }
+
+
+def _error_rate(result: Dict[str, Any]) -> float:
+    return result["error_replies"] / result["messages"] if result["messages"] else 0.0
+
+
+def compare_with_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+    error_tolerance: float = 0.01,
+) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Compara os cenários presentes nos dois lados e retorna (comparados, regressões, observações).
+
+    A taxa de respostas de erro é comparada primeiro (em pontos percentuais,
+    `error_tolerance`): recusas instantâneas (fila cheia) aumentam a vazão e
+    baixam os percentis, então mais erros nunca contam como melhora. Latência
+    p95 e vazão só são comparadas quando as taxas de erro são equivalentes;
+    se o cenário passou a errar menos, os números não são comparáveis e isso
+    vira uma observação em vez de regressão.
+    """
+    compared: List[str] = []
+    regressions: List[str] = []
+    notes: List[str] = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        compared.append(name)
+        error_rate, reference_error_rate = _error_rate(result), _error_rate(reference)
+        if error_rate > reference_error_rate + error_tolerance:
+            regressions.append(f"{name}: {error_rate:.1%} de respostas de erro > baseline {reference_error_rate:.1%}")
+            continue
+        if error_rate < reference_error_rate - error_tolerance:
+            notes.append(
+                f"{name}: {error_rate:.1%} de respostas de erro < baseline {reference_error_rate:.1%}; "
+                f"latência e vazão não comparadas (grave um novo baseline)"
+            )
+            continue
+        if result["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']}ms > baseline {reference['p95_ms']}ms")
+        if result["messages_per_s"] < reference["messages_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['messages_per_s']} msg/s < baseline {reference['messages_per_s']} msg/s")
+    return compared, regressions, notes
+
+
+def _print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'cenário':<12} {'msgs':>6} {'msg/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mem Δ KB':>10} {'LLM':>6} {'evit.':>6} {'erros':>6}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:<12} {r['messages']:>6} {r['messages_per_s']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+            f"{r['p99_ms']:>9.1f} {r['memory_growth_bytes'] / 1024:>10.1f} {r['llm_calls']:>6} "
+            f"{r['llm_calls_avoided']:>6} {r['error_replies']:>6}"
+        )
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(item) for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline de mensagens do bot.")
+    parser.add_argument("--users", type=_int_list, default=[10, 100], help="Lista de quantidades de usuários (ex.: 10,100,1000)")
+    parser.add_argument("--history", type=_int_list, default=[0, 10], help="Lista de tamanhos de histórico pré-existente")
+    parser.add_argument("--messages", type=int, default=5, help="Mensagens por usuário")
+    parser.add_argument("--latency", type=float, default=0.8, help="Latência mediana do LLM falso (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Dispersão log-normal da latência")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de chamadas ao LLM que falham")
+    parser.add_argument("--backend-latencies", type=_float_list, default=None, help="Pool de LLMs: latência mediana de cada backend (ex.: 0.8,3.0)")
+    parser.add_argument("--backend-error-rates", type=_float_list, default=None, help="Pool de LLMs: taxa de erro de cada backend (ex.: 0,0.3)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--trace-memory", action="store_true", help="Mede memória com tracemalloc (mais preciso, mais lento)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Arquivo de baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como novo baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Regressão tolerada em relação ao baseline (0.2 = 20%%)")
+    parser.add_argument("--error-tolerance", type=float, default=0.01, help="Aumento tolerado da taxa de respostas de erro (0.01 = 1 ponto percentual)")
+    parser.add_argument("--output", default=None, help="Grava os resultados completos em JSON")
+    args = parser.parse_args()
+
+    # Logs por mensagem distorcem a medição
+    setup_logging(level="WARNING")
+
+    llm_options = {"latency_median": args.latency, "latency_sigma": args.latency_sigma, "error_rate": args.error_rate}
+    backends = None
+    if args.backend_latencies or args.backend_error_rates:
+        count = max(len(args.backend_latencies or []), len(args.backend_error_rates or []))
+        backends = [{} for _ in range(count)]
+        for options, latency in zip(backends, args.backend_latencies or []):
+            options["latency_median"] = latency
+        for options, error_rate in zip(backends, args.backend_error_rates or []):
+            options["error_rate"] = error_rate
+    results: Dict[str, Dict[str, Any]] = {}
+    for users in args.users:
+        for history_size in args.history:
+            name = f"u{users}_h{history_size}"
+            results[name] = asyncio.run(
+                run_scenario(users, history_size, args.messages, llm_options, args.seed, args.trace_memory, backends)
+            )
+
+    _print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Baseline gravado em {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        compared, regressions, notes = compare_with_baseline(results, baseline, args.tolerance, args.error_tolerance)
+        if not compared:
+            print(f"\nNenhum cenário em comum com o baseline {args.baseline}; nada foi comparado.")
+            sys.exit(1)
+        for note in notes:
+            print(f"  - {note}")
+        if regressions:
+            print("\nRegressões em relação ao baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\nSem regressões em relação ao baseline (cenários comparados: {len(compared)}).")
+    else:
+        print(f"\nNenhum baseline em {args.baseline}; use --save-baseline para criar um.")
+
+
+if __name__ == "__main__":
+    main()
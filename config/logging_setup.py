@@ -0,0 +1,122 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional
+
+# Função que devolve o trace ID da mensagem em andamento (definida pela aplicação)
+_trace_id_getter: Optional[Callable[[], Optional[str]]] = None
+_listener: Optional[QueueListener] = None
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def set_trace_id_getter(getter: Optional[Callable[[], Optional[str]]]) -> None:
+    """Define de onde vem o trace ID anexado a cada registro de log."""
+    global _trace_id_getter
+    _trace_id_getter = getter
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Converte "logger=taxa,outro=taxa" (ex.: "config.settings.messages=0.1") em dicionário."""
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deixa passar só uma fração dos registros INFO/DEBUG dos loggers
+    configurados. WARNING ou acima sempre passa.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self._rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rates.get(record.name)
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha: horário, nível, logger, mensagem e trace ID (se houver)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            data["trace_id"] = trace_id
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que NÃO formata a mensagem na thread do event loop:
+    o registro vai para a fila como está e a thread de escrita faz o
+    `msg % args`. Os argumentos precisam ser valores que não mudam depois
+    (str, números), como nos logs do bot.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if _trace_id_getter is not None:
+            # O trace ID vem de um contextvar: só pode ser lido aqui, na thread que emitiu
+            record.trace_id = _trace_id_getter()
+        return record
+
+
+def setup_logging(level: str = "INFO", json_format: bool = False, sample_rates: Optional[Dict[str, float]] = None) -> None:
+    """
+    Configura o logging da aplicação: os handlers só enfileiram os
+    registros e uma thread em segundo plano formata e escreve no stderr.
+    Chamadas repetidas reconfiguram (a thread anterior é encerrada).
+    """
+    global _listener
+    stop_logging()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if json_format:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Escreve os registros pendentes e encerra a thread de escrita."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# Garante que nenhum registro fique na fila ao sair
+atexit.register(stop_logging)
@@ -1,25 +1,29 @@
 import os
-from dotenv import load_dotenv
 import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Tuple
 
-# Configuração básica de logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-# Carrega variáveis do arquivo .env
-load_dotenv()
+from config.logging_setup import parse_sample_rates
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Importar este módulo não tem efeitos colaterais: o .env, a validação e o
+# logging são carregados explicitamente na partida (load_settings/setup_logging).
+logger = logging.getLogger(__name__)
+# Logs de cada mensagem (alto volume): podem ser amostrados via LOG_SAMPLE_RATES
+message_logger = logging.getLogger(f"{__name__}.messages")
 
-# Validação básica das chaves
-if not GROQ_API_KEY:
-    logger.error("Erro: Chave da API da Groq (GROQ_API_KEY) não encontrada no .env")
-    raise ValueError("GROQ_API_KEY não definida")
+# --- Modo de Execução ---
+WEBHOOK_HEALTH_PATH = "/healthz"
+MAX_CONCURRENT_UPDATES = 256 # Updates processados em paralelo (sempre um por vez para cada usuário)
+OFFLINE_BOT_TOKEN = "123456:offline" # Token usado no modo offline quando TELEGRAM_BOT_TOKEN não está definido
 
-if not TELEGRAM_BOT_TOKEN:
-    logger.error("Erro: Token do Bot do Telegram (TELEGRAM_BOT_TOKEN) não encontrado no .env")
-    raise ValueError("TELEGRAM_BOT_TOKEN não definido")
+# --- Limites de Envio do Telegram (fila de saída; desativada no modo offline) ---
+TELEGRAM_GLOBAL_RATE = 30 # Mensagens por segundo do bot como um todo
+TELEGRAM_CHAT_RATE = 1.0 # Mensagens por segundo em um chat privado
+TELEGRAM_CHAT_BURST = 3 # Mensagens seguidas permitidas em um chat privado antes de limitar
+TELEGRAM_GROUP_RATE_PER_MINUTE = 20 # Mensagens por minuto em grupos
+TELEGRAM_MAX_RETRIES = 3 # Novas tentativas após RetryAfter (flood control)
+TELEGRAM_LOW_PRIORITY_RESERVE = 0.2 # Fração do limite global reservada ao tráfego normal
+CHAT_ACTION_COALESCE_SECONDS = 4.5 # "digitando..." repetido no mesmo chat dentro desse intervalo não é reenviado
 
 # --- Configurações Adicionais do Bot (pode adicionar mais aqui) ---
 MODEL_NAME = "llama3-8b-8192"
@@ -34,6 +38,18 @@ Forneça a resposta diretamente, sem frases como "Claro!" ou "Com certeza!".
 Não inclua cumprimentos genéricos como "Olá!" no início de cada resposta, vá direto ao ponto.
 """
 
+# --- Compactação do Histórico (orçamento de tokens + resumo das interações antigas) ---
+HISTORY_MAX_TOKENS = 1500 # Tokens (estimados) do histórico enviados completos ao LLM
+HISTORY_SUMMARY_MIN_TURNS = 3 # Interações fora do orçamento necessárias para atualizar o resumo
+HISTORY_CACHE_MAX_USERS = 10000 # Usuários com resumo/mensagens formatadas em cache
+SUMMARY_PREFIX = "Resumo da conversa até aqui: "
+SUMMARY_PROMPT = """
+Você resume conversas entre um fã da FURIA e um assistente.
+Atualize o resumo atual incorporando as novas interações.
+Mantenha apenas fatos úteis para continuar a conversa (assuntos, preferências e perguntas do fã).
+Responda somente com o resumo, em português brasileiro, em no máximo 5 frases.
+"""
+
 # Comandos predefinidos e respostas diretas (ou prompts para LLM)
 PREDEFINED_COMMANDS = {
     "próximos jogos": """
@@ -46,6 +62,214 @@ Vamos com tudo, FURIA! 🐾🔥
     "frases": '"A FURIA VEIO PRA VENCEEEEEEER🐾🔥", grito de torcida muito utilizado para expressar a alegria dos torcedores!', # Prompt para LLM
 }
 
+# --- Base de Conhecimento (fatos sobre a FURIA em arquivos JSON/Markdown) ---
+KNOWLEDGE_BASE_ENABLED = True
+KNOWLEDGE_BASE_RELOAD_SECONDS = 30 # Intervalo de verificação de arquivos alterados (0 desativa)
+KNOWLEDGE_TOP_K = 3 # Trechos no máximo enviados ao LLM
+KNOWLEDGE_DIRECT_ANSWER_CONFIDENCE = 0.9 # Cobertura mínima da pergunta para responder sem o LLM
+KNOWLEDGE_DIRECT_ANSWER_MARGIN = 1.5 # Nota do melhor trecho em relação ao segundo para responder direto
+KNOWLEDGE_CONTEXT_MIN_CONFIDENCE = 0.3 # Trechos com cobertura menor não entram no prompt
+KNOWLEDGE_PROMPT_PREFIX = "Fatos sobre a FURIA que podem ajudar na resposta (use apenas se forem relevantes):\n"
+
+# Mensagem devolvida quando o LLM falha (não deve ser guardada em cache)
+LLM_ERROR_MESSAGE = "Desculpe, tive um problema interno ao processar sua mensagem. Tente novamente mais tarde. 😥"
+# Mensagens devolvidas quando o scheduler do LLM recusa a requisição
+LLM_BUSY_MESSAGE = "Muita gente falando comigo agora! 🐾 Tenta de novo em alguns segundos que eu te respondo. 🔥"
+LLM_TIMEOUT_MESSAGE = "Demorei demais para pensar na resposta... 😅 Pode mandar sua pergunta de novo?"
+# Anexado à resposta parcial quando o streaming falha no meio
+LLM_STREAM_INTERRUPTED_MESSAGE = "\n\n(Minha resposta foi interrompida... 😅 Pode perguntar de novo?)"
+# Respostas dos handlers do Telegram quando o processamento da mensagem levanta uma exceção
+UNEXPECTED_ERROR_MESSAGE = "Ocorreu um erro inesperado ao processar sua solicitação. Por favor, tente novamente."
+INTERNAL_ERROR_MESSAGE = "Desculpe, ocorreu um erro interno. A equipe foi notificada."
+
+# --- Scheduler do LLM (concorrência limitada, fila justa entre usuários) ---
+LLM_MAX_IN_FLIGHT = 8 # Máximo de chamadas simultâneas ao Groq
+LLM_MAX_QUEUE_SIZE = 200 # Acima disso as requisições são recusadas na hora
+LLM_REQUEST_TIMEOUT_SECONDS = 30 # Prazo por requisição (fila + geração)
+LLM_MAX_BACKGROUND_IN_FLIGHT = 1 # Vagas que os resumos de conversa (prioridade baixa) podem ocupar
+
+# --- Pool de LLMs (só com mais de um modelo em LLM_MODELS) ---
+LLM_POOL_WINDOW = 50 # Chamadas recentes consideradas na latência/taxa de erro de cada backend
+LLM_POOL_ERROR_RATE_THRESHOLD = 0.5 # Taxa de erro que abre o circuito do backend
+LLM_POOL_MAX_CONSECUTIVE_FAILURES = 3 # Falhas seguidas que abrem o circuito
+LLM_POOL_OPEN_SECONDS = 30 # Tempo fora da rotação antes da chamada de teste
+LLM_POOL_HEDGING_ENABLED = True # Repete a chamada em outro backend se a primeira demorar
+LLM_POOL_HEDGE_MIN_SECONDS = 1.0 # Espera mínima antes do hedging (o normal é o p95 do backend)
+LLM_POOL_EXPLORE_RATE = 0.05 # Fração das chamadas enviadas ao segundo mais rápido (mantém a medição atualizada)
+
+# --- Streaming de respostas no Telegram (edições progressivas da mensagem) ---
+STREAMING_ENABLED = True
+STREAM_EDIT_INTERVAL_SECONDS = 1.0 # Intervalo mínimo entre edições (limite de edição do Telegram)
+STREAM_MIN_FIRST_CHARS = 20 # Caracteres acumulados antes de enviar a primeira mensagem
+
+# --- Memória da Conversa ---
+MEMORY_MAX_HISTORY_SIZE = 10 # Interações guardadas por usuário
+MEMORY_IDLE_TTL_SECONDS = 6 * 3600 # Usuários ociosos há mais tempo são removidos da RAM
+MEMORY_MAX_TOTAL_BYTES = 64 * 1024 * 1024 # Orçamento de RAM da memória em processo (LRU acima disso)
+SQLITE_MEMORY_SHARDS = 4 # Número de arquivos SQLite (shard = user_id % SHARDS)
+# Usuários recentes mantidos em RAM (0 desativa). Só aumente com uma única instância ou se cada usuário
+# for sempre atendido pela mesma instância: com várias, cada processo teria sua cópia (histórico velho)
+SQLITE_MEMORY_HOT_USERS = 0
+SQLITE_MEMORY_FLUSH_INTERVAL_SECONDS = 1.0 # Intervalo da gravação em lote (write-behind)
+SQLITE_MEMORY_FLUSH_BATCH_SIZE = 100 # Grava antes do intervalo se a fila de um shard chegar a isso
+
+# --- Cache de Respostas (na frente do LLM) ---
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_TTL_SECONDS = 600 # Tempo de vida de cada resposta em cache
+RESPONSE_CACHE_MAX_ENTRIES = 5000
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024 # Orçamento de memória do cache (16 MB)
+RESPONSE_CACHE_SIMILARITY_THRESHOLD = 0.85 # Similaridade mínima (cosseno de trigramas) para reaproveitar resposta (números e nomes também precisam coincidir)
+
+# --- Single-flight (agrupa requisições idênticas simultâneas ao LLM) ---
+SINGLE_FLIGHT_ENABLED = True
+
+# Paráfrases dos comandos predefinidos, usadas pelo índice de intenções para evitar chamadas ao LLM
+PREDEFINED_COMMAND_PARAPHRASES = {
+    "próximos jogos": [
+        "próximo jogo", "proximos jogos da furia", "quando é o próximo jogo", "quando é o próximo jogo da furia",
+        "quando a furia joga", "quando joga a furia", "qual o próximo jogo", "qual o próximo confronto",
+        "agenda de jogos", "calendário de jogos", "próxima partida", "quando é a próxima partida",
+    ],
+    "jogadores": [
+        "quem são os jogadores", "quem são os jogadores da furia", "jogadores da furia", "elenco", "elenco da furia",
+        "line up", "lineup da furia", "quem joga na furia", "qual a line da furia", "time atual", "quem é o treinador",
+    ],
+    "curiosidades": [
+        "curiosidade", "me conta uma curiosidade", "fala uma curiosidade", "curiosidades da furia",
+        "fatos sobre a furia", "conta algo sobre a furia",
+    ],
+    "frases": [
+        "frase", "frases da torcida", "grito da torcida", "grito de guerra", "qual o grito da torcida",
+        "frases marcantes", "frase da furia",
+    ],
+}
+INTENT_MATCH_THRESHOLD = 0.75 # Confiança mínima para responder com um comando predefinido sem o LLM
+
 ALLOWED_USER_IDS = [] # Opcional: Lista de IDs de usuário permitidos (se vazio, permite todos)
 
-logger.info("Configurações carregadas com sucesso.")
\ No newline at end of file
+
+# --- Configurações do Ambiente (variáveis de ambiente / .env) ---
+_BOT_MODES = ("polling", "webhook")
+_MEMORY_BACKENDS = ("in_memory", "sqlite")
+_LOG_FORMATS = ("text", "json")
+
+
+def _env_flag(value: Optional[str], default: bool = False) -> bool:
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _env_int(environ: Mapping[str, str], name: str, default: int) -> int:
+    value = environ.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} deve ser um número inteiro (recebido: {value!r})") from None
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Configurações que vêm do ambiente. Criadas com `Settings.from_env()` (ou
+    `load_settings()`, que lê o .env antes) e passadas explicitamente para
+    a fiação da aplicação; os demais parâmetros são as constantes acima.
+    """
+
+    groq_api_key: Optional[str] = None
+    telegram_bot_token: Optional[str] = None
+    # Modo de execução
+    bot_mode: str = "polling" # "polling" ou "webhook"
+    webhook_listen: str = "0.0.0.0"
+    webhook_port: int = 8443
+    webhook_path: str = "/telegram"
+    webhook_secret_token: Optional[str] = None # Validado no cabeçalho X-Telegram-Bot-Api-Secret-Token
+    webhook_url: Optional[str] = None # URL pública; se definida, o webhook é registrado no Telegram ao iniciar
+    telegram_offline: bool = False # Não chama a API do Telegram
+    # Métricas e instrumentação
+    metrics_enabled: bool = True
+    metrics_listen: str = "127.0.0.1" # Só local por padrão
+    metrics_port: int = 9100
+    trace_ids_enabled: bool = False # trace ID por mensagem + log das etapas (DEBUG)
+    # Modelos do pool; com mais de um, as chamadas são roteadas entre eles
+    llm_models: Tuple[str, ...] = (MODEL_NAME,)
+    knowledge_base_dir: str = "knowledge"
+    memory_backend: str = "in_memory" # "in_memory" ou "sqlite"
+    sqlite_memory_dir: str = "data/memory"
+    # Logging
+    log_level: str = "INFO"
+    log_format: str = "text" # "text" ou "json"
+    # Fração dos logs INFO/DEBUG mantida por logger, ex.: "config.settings.messages=0.1"
+    log_sample_rates: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        """Lê as configurações de `environ` (padrão: os.environ), sem validar."""
+        env = os.environ if environ is None else environ
+        models = [model.strip() for model in env.get("LLM_MODELS", MODEL_NAME).split(",") if model.strip()]
+        return cls(
+            groq_api_key=env.get("GROQ_API_KEY") or None,
+            telegram_bot_token=env.get("TELEGRAM_BOT_TOKEN") or None,
+            bot_mode=env.get("BOT_MODE", "polling"),
+            webhook_listen=env.get("WEBHOOK_LISTEN", "0.0.0.0"),
+            webhook_port=_env_int(env, "WEBHOOK_PORT", 8443),
+            webhook_path=env.get("WEBHOOK_PATH", "/telegram"),
+            webhook_secret_token=env.get("WEBHOOK_SECRET_TOKEN") or None,
+            webhook_url=env.get("WEBHOOK_URL") or None,
+            telegram_offline=_env_flag(env.get("TELEGRAM_OFFLINE")),
+            metrics_enabled=_env_flag(env.get("METRICS_ENABLED"), default=True),
+            metrics_listen=env.get("METRICS_LISTEN", "127.0.0.1"),
+            metrics_port=_env_int(env, "METRICS_PORT", 9100),
+            trace_ids_enabled=_env_flag(env.get("TRACE_IDS_ENABLED")),
+            llm_models=tuple(models),
+            knowledge_base_dir=env.get("KNOWLEDGE_BASE_DIR", "knowledge"),
+            memory_backend=env.get("MEMORY_BACKEND", "in_memory"),
+            sqlite_memory_dir=env.get("SQLITE_MEMORY_DIR", "data/memory"),
+            log_level=env.get("LOG_LEVEL", "INFO").upper(),
+            log_format=env.get("LOG_FORMAT", "text"),
+            log_sample_rates=parse_sample_rates(env.get("LOG_SAMPLE_RATES", "")),
+        )
+
+    def validate(self, require_groq_key: bool = True, require_telegram_token: Optional[bool] = None) -> "Settings":
+        """
+        Verifica as configurações e levanta ValueError listando todos os problemas.
+
+        Args:
+            require_groq_key: False quando o LLM é fornecido de fora (ex.: benchmarks).
+            require_telegram_token: None exige o token só fora do modo offline.
+        """
+        if require_telegram_token is None:
+            require_telegram_token = not self.telegram_offline
+        errors: List[str] = []
+        if require_groq_key and not self.groq_api_key:
+            errors.append("Chave da API da Groq (GROQ_API_KEY) não definida")
+        if require_telegram_token and not self.telegram_bot_token:
+            errors.append("Token do Bot do Telegram (TELEGRAM_BOT_TOKEN) não definido")
+        if self.bot_mode not in _BOT_MODES:
+            errors.append(f"BOT_MODE deve ser um de {_BOT_MODES} (recebido: {self.bot_mode!r})")
+        if self.memory_backend not in _MEMORY_BACKENDS:
+            errors.append(f"MEMORY_BACKEND deve ser um de {_MEMORY_BACKENDS} (recebido: {self.memory_backend!r})")
+        if self.log_format not in _LOG_FORMATS:
+            errors.append(f"LOG_FORMAT deve ser um de {_LOG_FORMATS} (recebido: {self.log_format!r})")
+        if not isinstance(logging.getLevelName(self.log_level), int):
+            errors.append(f"LOG_LEVEL inválido: {self.log_level!r}")
+        for name, port in (("WEBHOOK_PORT", self.webhook_port), ("METRICS_PORT", self.metrics_port)):
+            if not 0 < port < 65536:
+                errors.append(f"{name} fora do intervalo 1-65535: {port}")
+        if not self.webhook_path.startswith("/"):
+            errors.append(f"WEBHOOK_PATH deve começar com '/' (recebido: {self.webhook_path!r})")
+        if not self.llm_models:
+            errors.append("LLM_MODELS não tem nenhum modelo")
+        if errors:
+            raise ValueError("; ".join(errors))
+        return self
+
+
+def load_settings(dotenv_path: Optional[str] = None) -> Settings:
+    """Carrega o arquivo .env (se existir) no ambiente e lê as configurações."""
+    from dotenv import load_dotenv # Só quem parte o bot precisa do python-dotenv
+
+    load_dotenv(dotenv_path)
+    return Settings.from_env()
@@ -1,14 +1,24 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 
 # Define a estrutura esperada para o histórico (tupla de string input/output)
 ChatHistoryType = List[Tuple[str, str]]
 
+
+class StreamInterruptedError(Exception):
+    """
+    O streaming falhou depois de já ter entregado pedaços: o texto recebido
+    até aqui é uma resposta incompleta e não deve ser guardado como se fosse
+    a resposta inteira (cache, histórico).
+    """
+
 class ChatbotGateway(ABC):
     """Interface para interagir com o modelo de linguagem."""
 
     @abstractmethod
-    async def generate_response(self, user_id: int, user_input: str, history: ChatHistoryType) -> str:
+    async def generate_response(
+        self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None
+    ) -> str:
         """
         Gera uma resposta do chatbot com base na entrada e histórico do usuário.
 
@@ -16,8 +26,43 @@ class ChatbotGateway(ABC):
             user_id: Identificador único do usuário.
             user_input: A mensagem mais recente do usuário.
             history: O histórico da conversa [(input_user1, output_bot1), ...].
+            context: Trechos da base de conhecimento relevantes para a pergunta (opcional).
 
         Returns:
             A resposta gerada pelo chatbot.
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def stream_response(
+        self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Gera a resposta em pedaços (tokens), conforme ficam prontos.
+
+        A implementação padrão entrega a resposta completa de uma vez;
+        gateways que suportam streaming devem sobrescrever este método.
+
+        Yields:
+            Pedaços consecutivos da resposta; concatenados formam a resposta completa.
+
+        Raises:
+            StreamInterruptedError: se a geração falhar depois do primeiro pedaço.
+        """
+        yield await self.generate_response(user_id, user_input, history, context)
+
+    async def summarize_history(self, user_id: int, previous_summary: str, turns: ChatHistoryType) -> str:
+        """
+        Atualiza o resumo da conversa incorporando as interações informadas.
+
+        Chamado em segundo plano quando o histórico não cabe mais no prompt;
+        gateways que não resumem conversas mantêm esta implementação.
+
+        Args:
+            user_id: Identificador único do usuário.
+            previous_summary: Resumo atual (vazio se ainda não houver).
+            turns: Interações que ainda não estão no resumo.
+
+        Returns:
+            O resumo atualizado.
+        """
+        raise NotImplementedError(f"{type(self).__name__} não resume conversas")
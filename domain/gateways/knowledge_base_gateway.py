@@ -0,0 +1,37 @@
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple
+
+
+class KnowledgeSnippet(NamedTuple):
+    """Trecho da base de conhecimento encontrado para uma pergunta."""
+    title: str
+    text: str
+    score: float # Relevância bruta (BM25); só comparável dentro da mesma busca
+    confidence: float # 0 a 1: quanto da pergunta o trecho cobre
+    source: str # Arquivo de origem
+
+
+class KnowledgeBaseGateway(ABC):
+    """Interface para consultar fatos sobre a FURIA guardados fora do LLM."""
+
+    @abstractmethod
+    def search(self, query: str, top_k: int = 3) -> List[KnowledgeSnippet]:
+        """
+        Busca os trechos mais relevantes para a pergunta.
+
+        Args:
+            query: Texto da pergunta do usuário.
+            top_k: Número máximo de trechos retornados.
+
+        Returns:
+            Trechos em ordem decrescente de relevância (lista vazia se nada casar).
+        """
+        pass
+
+    async def start(self) -> None:
+        """Inicializa recursos em segundo plano (ex.: recarga dos arquivos). Opcional."""
+        pass
+
+    async def close(self) -> None:
+        """Libera recursos ao desligar o bot. Opcional."""
+        pass
@@ -20,4 +20,12 @@ class MemoryGateway(ABC):
     @abstractmethod
     async def clear_history(self, user_id: int) -> None:
         """Limpa o histórico de conversa para um usuário específico."""
-        pass
\ No newline at end of file
+        pass
+
+    async def start(self) -> None:
+        """Inicializa recursos em segundo plano (ex.: tarefas de gravação). Opcional."""
+        pass
+
+    async def close(self) -> None:
+        """Grava pendências e libera recursos ao desligar o bot. Opcional."""
+        pass
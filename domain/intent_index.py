@@ -0,0 +1,130 @@
+import math
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set
+
+from domain.text_utils import normalize_text, char_ngrams, within_one_edit
+
+# Palavras muito comuns que não ajudam a distinguir intenções
+_STOPWORDS = frozenset({
+    "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos", "e", "em", "na", "no",
+    "nas", "nos", "me", "pra", "para", "por", "que", "qual", "quais", "quem", "sao",
+    "fala", "fale", "conta", "conte", "sobre", "ai", "hoje", "furia", "time", "voce", "tem",
+    "eh", "vai", "ser", "sera", "esta", "agora", "atual", "atualmente",
+})
+
+
+class IntentMatch(NamedTuple):
+    """Resultado de uma busca no índice de intenções."""
+    command: str
+    score: float
+    phrase: str
+
+
+class _Phrase:
+    __slots__ = ("command", "text", "tokens", "ngrams")
+
+    def __init__(self, command: str, text: str):
+        self.command = command
+        self.text = text
+        self.tokens = _content_tokens(text)
+        self.ngrams = char_ngrams(text)
+
+
+def _content_tokens(normalized: str) -> FrozenSet[str]:
+    return frozenset(token for token in normalized.split() if token not in _STOPWORDS)
+
+
+def _same_word(a: str, b: str) -> bool:
+    """Iguais ou, com 4+ letras, a uma letra de distância (plural, erro de digitação)."""
+    return a == b or (min(len(a), len(b)) >= 4 and within_one_edit(a, b))
+
+
+def _covers(phrase_tokens: FrozenSet[str], query_tokens: FrozenSet[str]) -> bool:
+    """Toda palavra relevante da mensagem aparece na frase do comando."""
+    return all(token in phrase_tokens or any(_same_word(token, other) for other in phrase_tokens) for token in query_tokens)
+
+
+class IntentIndex:
+    """
+    Índice pré-calculado das frases dos comandos predefinidos e suas paráfrases.
+
+    A busca tenta, nesta ordem:
+      1. Frase normalizada idêntica (dicionário, O(1)).
+      2. Similaridade entre as frases candidatas que compartilham palavras
+         ou trigramas com a mensagem (índices invertidos). A nota é o maior
+         valor entre o coeficiente de Dice das palavras relevantes e o
+         cosseno dos trigramas de caracteres.
+
+    Só devolve um comando quando a nota atinge `threshold` e toda palavra
+    relevante da mensagem aparece na frase: "próximo jogo da loud" é
+    parecida com "próximo jogo", mas "loud" muda a pergunta e a resposta
+    pronta (sobre a FURIA) estaria errada.
+    """
+
+    def __init__(self, phrases_by_command: Dict[str, Iterable[str]], threshold: float = 0.75):
+        self._threshold = threshold
+        self._exact: Dict[str, str] = {}
+        self._phrases: List[_Phrase] = []
+        self._token_index: Dict[str, Set[int]] = {}
+        self._ngram_index: Dict[str, Set[int]] = {}
+
+        for command, phrases in phrases_by_command.items():
+            for phrase in [command, *phrases]:
+                normalized = normalize_text(phrase)
+                if not normalized or normalized in self._exact:
+                    continue
+                self._exact[normalized] = command
+                phrase_id = len(self._phrases)
+                entry = _Phrase(command, normalized)
+                self._phrases.append(entry)
+                for token in entry.tokens:
+                    self._token_index.setdefault(token, set()).add(phrase_id)
+                for ngram in entry.ngrams:
+                    self._ngram_index.setdefault(ngram, set()).add(phrase_id)
+
+    @classmethod
+    def from_commands(
+        cls, commands: Iterable[str], paraphrases: Dict[str, Iterable[str]], threshold: float = 0.75
+    ) -> "IntentIndex":
+        """Cria o índice a partir das chaves dos comandos e do dicionário de paráfrases."""
+        return cls({command: paraphrases.get(command, ()) for command in commands}, threshold)
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """Retorna o comando mais provável para o texto ou None se a confiança for baixa."""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+
+        command = self._exact.get(normalized)
+        if command is not None:
+            return IntentMatch(command, 1.0, normalized)
+
+        tokens = _content_tokens(normalized)
+        ngrams = char_ngrams(normalized)
+
+        shared_tokens: Dict[int, int] = {}
+        for token in tokens:
+            for phrase_id in self._token_index.get(token, ()):
+                shared_tokens[phrase_id] = shared_tokens.get(phrase_id, 0) + 1
+        shared_ngrams: Dict[int, int] = {}
+        for ngram in ngrams:
+            for phrase_id in self._ngram_index.get(ngram, ()):
+                shared_ngrams[phrase_id] = shared_ngrams.get(phrase_id, 0) + 1
+
+        best: Optional[IntentMatch] = None
+        for phrase_id, common_ngrams in shared_ngrams.items():
+            phrase = self._phrases[phrase_id]
+            if not _covers(phrase.tokens, tokens):
+                continue
+            score = common_ngrams / math.sqrt(len(ngrams) * len(phrase.ngrams))
+            common_tokens = shared_tokens.get(phrase_id, 0)
+            if common_tokens:
+                score = max(score, 2 * common_tokens / (len(tokens) + len(phrase.tokens)))
+            if best is None or score > best.score:
+                best = IntentMatch(phrase.command, score, phrase.text)
+
+        if best is None or best.score < self._threshold:
+            return None
+        return best
@@ -0,0 +1,50 @@
+import re
+import unicodedata
+from typing import FrozenSet
+
+# Tudo que não for letra, número ou espaço vira separador
+_NON_WORD_RE = re.compile(r"[^\w\s]+", re.UNICODE)
+_SPACES_RE = re.compile(r"\s+")
+
+
+def fold_accents(text: str) -> str:
+    """Remove acentos/diacríticos ("próximos" -> "proximos")."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza um texto para comparação: minúsculas, sem acentos,
+    sem pontuação e com espaços colapsados.
+    """
+    folded = fold_accents(text.lower())
+    folded = _NON_WORD_RE.sub(" ", folded).replace("_", " ")
+    return _SPACES_RE.sub(" ", folded).strip()
+
+
+def char_ngrams(normalized: str, n: int = 3) -> FrozenSet[str]:
+    """
+    Retorna o conjunto de n-gramas de caracteres de um texto já normalizado.
+    Usa bordas com espaço para que o início/fim das palavras também contem.
+    """
+    if not normalized:
+        return frozenset()
+    padded = f" {normalized} "
+    if len(padded) <= n:
+        return frozenset([padded])
+    return frozenset(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True se `b` difere de `a` por no máximo uma letra inserida, removida ou trocada."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
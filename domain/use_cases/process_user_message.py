@@ -1,47 +1,148 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
 from domain.gateways.chatbot_gateway import ChatbotGateway
 from domain.gateways.memory_gateway import MemoryGateway
+from domain.gateways.knowledge_base_gateway import KnowledgeBaseGateway, KnowledgeSnippet
+from domain.intent_index import IntentIndex
 from config import settings # Importa comandos predefinidos
-from config.settings import logger
+from config.settings import logger, message_logger
 
 class ProcessUserMessageUseCase:
     """Caso de uso para processar uma mensagem recebida do usuário."""
 
-    def __init__(self, chatbot_gateway: ChatbotGateway, memory_gateway: MemoryGateway):
+    def __init__(
+        self,
+        chatbot_gateway: ChatbotGateway,
+        memory_gateway: MemoryGateway,
+        intent_index: Optional[IntentIndex] = None,
+        knowledge_base: Optional[KnowledgeBaseGateway] = None
+    ):
         self.chatbot_gateway = chatbot_gateway
         self.memory_gateway = memory_gateway
         self.predefined_commands = settings.PREDEFINED_COMMANDS
+        # Índice de paráfrases dos comandos (opcional), consultado antes do LLM
+        self.intent_index = intent_index
+        # Base de conhecimento (opcional): responde direto ou fornece trechos ao LLM
+        self.knowledge_base = knowledge_base
+        self._stats = {
+            "predefined_hits": 0, # Comando predefinido digitado exatamente
+            "intent_hits": 0, # Paráfrase reconhecida pelo índice de intenções
+            "knowledge_hits": 0, # Respondida direto pela base de conhecimento
+            "knowledge_context": 0, # Chamadas ao LLM com trechos da base no prompt
+            "llm_calls": 0,
+        }
         logger.info("Use Case 'ProcessUserMessage' inicializado.")
 
-    async def execute(self, user_id: int, user_input: str) -> str:
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna quantas mensagens foram respondidas sem o LLM e quantas o consultaram."""
+        stats = dict(self._stats)
+        stats["llm_calls_avoided"] = (
+            self._stats["predefined_hits"] + self._stats["intent_hits"] + self._stats["knowledge_hits"]
+        )
+        return stats
+
+    def _route(self, user_input: str) -> Tuple[Optional[str], str, Optional[List[str]]]:
         """
-        Processa a mensagem do usuário, verifica comandos predefinidos,
-        consulta o LLM se necessário e atualiza a memória.
+        Decide como responder à mensagem.
+
+        Returns:
+            (resposta_direta, input_para_llm, contexto). Se a resposta direta
+            for None, o input_para_llm deve ser enviado ao LLM junto com os
+            trechos da base de conhecimento em `contexto` (ou None).
         """
-        logger.info(f"Executando Use Case para user_id {user_id} com input: '{user_input}'")
         normalized_input = user_input.strip().lower()
-        bot_response = ""
 
-        # 1. Verificar Comandos Predefinidos
-        if normalized_input in self.predefined_commands:
-            response_or_prompt = self.predefined_commands[normalized_input]
+        # 1. Verificar Comandos Predefinidos (texto exato ou paráfrase conhecida)
+        command = normalized_input if normalized_input in self.predefined_commands else None
+        hit_counter = "predefined_hits"
+        if command is None and self.intent_index is not None:
+            match = self.intent_index.match(user_input)
+            if match is not None:
+                message_logger.info("Input '%s' reconhecido como '%s' (confiança %.2f).", normalized_input, match.command, match.score)
+                command = match.command
+                hit_counter = "intent_hits"
+
+        if command is not None:
+            normalized_input = command
+            response_or_prompt = self.predefined_commands[command]
             # Se for um prompt para o LLM (começa com "Fale", "Conte", "Quais são")
             if response_or_prompt.startswith(("fale", "conte", "quais são")):
-                logger.info(f"Comando '{normalized_input}' mapeado para prompt do LLM.")
+                message_logger.info("Comando '%s' mapeado para prompt do LLM.", normalized_input)
                 # Usaremos o prompt como input para o LLM, mas com o histórico ATUAL
-                history = await self.memory_gateway.get_history(user_id)
-                bot_response = await self.chatbot_gateway.generate_response(user_id, response_or_prompt, history)
-            else:
-                # É uma resposta direta
-                logger.info(f"Comando '{normalized_input}' mapeado para resposta direta.")
-                bot_response = response_or_prompt
+                self._stats["llm_calls"] += 1
+                return None, response_or_prompt, None
+            # É uma resposta direta
+            message_logger.info("Comando '%s' mapeado para resposta direta.", normalized_input)
+            self._stats[hit_counter] += 1
+            return response_or_prompt, user_input, None
+
+        # 2. Não é comando predefinido: consultar a base de conhecimento
+        context = None
+        if self.knowledge_base is not None:
+            snippets = self.knowledge_base.search(user_input, top_k=settings.KNOWLEDGE_TOP_K)
+            if snippets and self._is_confident_answer(snippets):
+                message_logger.info("Input respondido pela base de conhecimento ('%s').", snippets[0].title)
+                self._stats["knowledge_hits"] += 1
+                return snippets[0].text, user_input, None
+            context = [
+                snippet.text for snippet in snippets
+                if snippet.confidence >= settings.KNOWLEDGE_CONTEXT_MIN_CONFIDENCE
+            ] or None
+            if context:
+                self._stats["knowledge_context"] += 1
+
+        # 3. Consultar LLM
+        message_logger.info("Input não é comando predefinido, consultando LLM.")
+        self._stats["llm_calls"] += 1
+        return None, user_input, context
+
+    @staticmethod
+    def _is_confident_answer(snippets: List[KnowledgeSnippet]) -> bool:
+        """O melhor trecho cobre a pergunta inteira e se destaca do segundo colocado."""
+        best = snippets[0]
+        if best.confidence < settings.KNOWLEDGE_DIRECT_ANSWER_CONFIDENCE:
+            return False
+        return len(snippets) == 1 or best.score >= snippets[1].score * settings.KNOWLEDGE_DIRECT_ANSWER_MARGIN
+
+    async def execute(self, user_id: int, user_input: str) -> str:
+        """
+        Processa a mensagem do usuário, verifica comandos predefinidos,
+        consulta o LLM se necessário e atualiza a memória.
+        """
+        message_logger.info("Executando Use Case para user_id %s com input: '%s'", user_id, user_input)
+        direct_response, llm_input, context = self._route(user_input)
+
+        if direct_response is not None:
+            bot_response = direct_response
         else:
-            # 2. Não é comando predefinido, consultar LLM
-            logger.info(f"Input não é comando predefinido, consultando LLM.")
             history = await self.memory_gateway.get_history(user_id)
-            bot_response = await self.chatbot_gateway.generate_response(user_id, user_input, history)
+            bot_response = await self.chatbot_gateway.generate_response(user_id, llm_input, history, context)
 
         # 3. Adicionar interação à memória (mesmo se for resposta predefinida)
         await self.memory_gateway.add_interaction(user_id, user_input, bot_response)
-        logger.info(f"Interação salva na memória para user_id {user_id}.")
+        message_logger.info("Interação salva na memória para user_id %s.", user_id)
+
+        return bot_response
+
+    async def execute_stream(self, user_id: int, user_input: str) -> AsyncIterator[str]:
+        """
+        Mesmo fluxo de `execute`, mas entrega a resposta em pedaços conforme
+        o LLM gera. A interação só é salva na memória ao final do streaming;
+        um StreamInterruptedError é repassado sem salvar a resposta parcial.
+        """
+        message_logger.info("Executando Use Case (streaming) para user_id %s com input: '%s'", user_id, user_input)
+        direct_response, llm_input, context = self._route(user_input)
+
+        if direct_response is not None:
+            bot_response = direct_response
+            yield bot_response
+        else:
+            history = await self.memory_gateway.get_history(user_id)
+            chunks = []
+            async for chunk in self.chatbot_gateway.stream_response(user_id, llm_input, history, context):
+                chunks.append(chunk)
+                yield chunk
+            bot_response = "".join(chunks)
 
-        return bot_response
\ No newline at end of file
+        await self.memory_gateway.add_interaction(user_id, user_input, bot_response)
+        message_logger.info("Interação salva na memória para user_id %s.", user_id)
@@ -0,0 +1,320 @@
+import hashlib
+import math
+import sys
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional, Set
+
+from domain.gateways.chatbot_gateway import ChatbotGateway, ChatHistoryType
+from domain.text_utils import normalize_text, char_ngrams, within_one_edit
+from config import settings
+from config.settings import logger, message_logger
+
+# Custo aproximado (em bytes) de cada n-grama guardado no índice invertido
+_NGRAM_OVERHEAD_BYTES = 64
+
+# Palavras que podem mudar entre duas perguntas sem mudar a resposta
+_STOPWORDS = frozenset({
+    "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos", "e", "em", "na", "no",
+    "nas", "nos", "me", "pra", "para", "por", "com", "que", "qual", "quais", "quem", "como",
+    "se", "ao", "aos", "ou", "eh", "sao", "voce", "sobre", "ai", "tem",
+})
+
+
+def _content_tokens(normalized: str) -> FrozenSet[str]:
+    return frozenset(token for token in normalized.split() if token not in _STOPWORDS)
+
+
+def _same_token(a: str, b: str) -> bool:
+    """
+    Palavras equivalentes para o cache: iguais ou, em palavras longas sem
+    dígitos, um erro de digitação/plural de distância. Números, nomes curtos
+    (times, mapas) e datas precisam ser idênticos.
+    """
+    if a == b:
+        return True
+    if min(len(a), len(b)) < 5 or any(ch.isdigit() for ch in a + b):
+        return False
+    return within_one_edit(a, b)
+
+
+def _tokens_match(query: FrozenSet[str], cached: FrozenSet[str]) -> bool:
+    """Toda palavra relevante de cada lado precisa ter equivalente do outro."""
+    return (
+        all(any(_same_token(token, other) for other in cached) for token in query)
+        and all(any(_same_token(token, other) for other in query) for token in cached)
+    )
+
+
+def _scope_key(history: ChatHistoryType, context: Optional[List[str]]) -> str:
+    """
+    Resumo de tudo que, além da pergunta, muda a resposta: o histórico inteiro
+    enviado ao LLM ("e qual a idade dele?" depende de quem é "ele") e os
+    trechos da base de conhecimento.
+    """
+    if not history and not context:
+        return ""
+    digest = hashlib.sha1()
+    for human_msg, ai_msg in history:
+        digest.update(b"\x00")
+        digest.update(human_msg.encode("utf-8"))
+        digest.update(b"\x01")
+        digest.update(ai_msg.encode("utf-8"))
+    for snippet in context or []:
+        digest.update(b"\x02")
+        digest.update(snippet.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class _CacheEntry:
+    """Resposta guardada no cache (com __slots__ para economizar memória)."""
+
+    __slots__ = ("key", "scope", "response", "ngrams", "tokens", "aliases", "expires_at", "size_bytes")
+
+    def __init__(self, key: str, scope: str, normalized: str, response: str, expires_at: float):
+        self.key = key
+        self.scope = scope
+        self.response = response
+        self.ngrams = char_ngrams(normalized)
+        self.tokens = _content_tokens(normalized)
+        # Textos exatos que apontam para esta entrada (para limpar o índice exato)
+        self.aliases: Set[str] = set()
+        self.expires_at = expires_at
+        self.size_bytes = (
+            sys.getsizeof(key)
+            + sys.getsizeof(response)
+            + len(self.ngrams) * _NGRAM_OVERHEAD_BYTES
+        )
+
+
+class CachedChatbot(ChatbotGateway):
+    """
+    Cache de respostas na frente de outro ChatbotGateway.
+
+    A busca acontece em três níveis:
+      1. Texto exato (após strip).
+      2. Texto normalizado (minúsculas, sem acentos e sem pontuação).
+      3. Similaridade por trigramas de caracteres (cosseno), acima de um limiar,
+         desde que as palavras relevantes coincidam (números e nomes curtos
+         exatos; palavras longas toleram um erro de digitação). Assim "jogo de
+         ontem" não reaproveita a resposta de "jogo de hoje".
+
+    O cache é compartilhado entre usuários, mas a chave inclui o histórico
+    enviado ao LLM e os trechos da base de conhecimento: uma pergunta que
+    depende da conversa ("qual o nome completo dele?") só reaproveita a
+    resposta de uma conversa idêntica (na prática, perguntas feitas sem
+    histórico), e uma recarga da base não serve respostas baseadas nos
+    fatos antigos.
+
+    As entradas expiram por TTL e são removidas por LRU quando o número
+    máximo de entradas ou o orçamento de memória é ultrapassado.
+    """
+
+    def __init__(
+        self,
+        inner: ChatbotGateway,
+        ttl_seconds: float = 600.0,
+        max_entries: int = 5000,
+        max_bytes: int = 16 * 1024 * 1024,
+        similarity_threshold: float = 0.85,
+        min_words: int = 3,
+    ):
+        self._inner = inner
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._similarity_threshold = similarity_threshold
+        # Mensagens muito curtas ("sim", "e ele?") dependem do contexto e não são cacheadas
+        self._min_words = min_words
+        # Respostas de erro/sobrecarga nunca vão para o cache
+        self._uncacheable = {settings.LLM_ERROR_MESSAGE, settings.LLM_BUSY_MESSAGE, settings.LLM_TIMEOUT_MESSAGE}
+
+        # Chave (histórico/contexto + texto normalizado) -> entrada; a ordem do OrderedDict é a ordem LRU
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # Histórico/contexto + texto exato -> chave
+        self._exact_index: Dict[str, str] = {}
+        # Índice invertido: trigrama -> chaves que o contêm
+        self._ngram_index: Dict[str, Set[str]] = {}
+        self._total_bytes = 0
+
+        self._stats = {
+            "exact_hits": 0,
+            "normalized_hits": 0,
+            "similar_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        logger.info(
+            f"Cache de respostas inicializado (TTL {ttl_seconds}s, máx. {max_entries} entradas, "
+            f"{max_bytes} bytes, limiar de similaridade {similarity_threshold})."
+        )
+
+    async def generate_response(self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None) -> str:
+        """Responde do cache quando possível; caso contrário consulta o gateway interno."""
+        exact_key = user_input.strip()
+        normalized = normalize_text(exact_key)
+
+        if len(normalized.split()) < self._min_words:
+            self._stats["bypassed"] += 1
+            return await self._inner.generate_response(user_id, user_input, history, context)
+
+        scope_key = _scope_key(history, context)
+        cached = self._lookup(scope_key, exact_key, normalized)
+        if cached is not None:
+            return cached
+
+        self._stats["misses"] += 1
+        response = await self._inner.generate_response(user_id, user_input, history, context)
+        if response and response not in self._uncacheable:
+            self._store(scope_key, exact_key, normalized, response)
+        return response
+
+    async def stream_response(self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """Entrega a resposta do cache de uma vez ou repassa o streaming, guardando o texto final."""
+        exact_key = user_input.strip()
+        normalized = normalize_text(exact_key)
+
+        if len(normalized.split()) < self._min_words:
+            self._stats["bypassed"] += 1
+            async for chunk in self._inner.stream_response(user_id, user_input, history, context):
+                yield chunk
+            return
+
+        scope_key = _scope_key(history, context)
+        cached = self._lookup(scope_key, exact_key, normalized)
+        if cached is not None:
+            yield cached
+            return
+
+        self._stats["misses"] += 1
+        chunks = []
+        # Se o streaming for interrompido (StreamInterruptedError) ou abandonado,
+        # a exceção sai daqui e o texto parcial nunca chega ao cache
+        async for chunk in self._inner.stream_response(user_id, user_input, history, context):
+            chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
+        if response and response not in self._uncacheable:
+            self._store(scope_key, exact_key, normalized, response)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Retorna contadores de acerto/erro e o uso atual de memória do cache."""
+        hits = self._stats["exact_hits"] + self._stats["normalized_hits"] + self._stats["similar_hits"]
+        lookups = hits + self._stats["misses"]
+        stats: Dict[str, float] = dict(self._stats)
+        stats["hits"] = hits
+        stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        stats["entries"] = len(self._entries)
+        stats["bytes"] = self._total_bytes
+        return stats
+
+    # --- Busca ---
+
+    def _lookup(self, scope_key: str, exact_key: str, normalized: str) -> Optional[str]:
+        now = time.monotonic()
+
+        key = self._exact_index.get(f"{scope_key}|{exact_key}")
+        if key is not None:
+            entry = self._get_live_entry(key, now)
+            if entry is not None:
+                self._stats["exact_hits"] += 1
+                return entry.response
+
+        entry = self._get_live_entry(f"{scope_key}|{normalized}", now)
+        if entry is not None:
+            self._stats["normalized_hits"] += 1
+            self._add_alias(entry, exact_key)
+            return entry.response
+
+        entry = self._find_similar(scope_key, normalized, now)
+        if entry is not None:
+            self._stats["similar_hits"] += 1
+            message_logger.debug("Cache: '%s' similar a '%s'.", normalized, entry.key)
+            return entry.response
+
+        return None
+
+    def _get_live_entry(self, key: str, now: float) -> Optional[_CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            self._stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _find_similar(self, scope_key: str, normalized: str, now: float) -> Optional[_CacheEntry]:
+        query_ngrams = char_ngrams(normalized)
+        if not query_ngrams:
+            return None
+        query_tokens = _content_tokens(normalized)
+
+        # Conta trigramas em comum usando o índice invertido (|A ∩ B| por candidato)
+        shared: Dict[str, int] = {}
+        for ngram in query_ngrams:
+            for key in self._ngram_index.get(ngram, ()):
+                shared[key] = shared.get(key, 0) + 1
+
+        best_key = None
+        best_score = 0.0
+        for key, common in shared.items():
+            entry = self._entries[key]
+            if entry.scope != scope_key:
+                continue
+            score = common / math.sqrt(len(query_ngrams) * len(entry.ngrams))
+            if score > best_score and score >= self._similarity_threshold and _tokens_match(query_tokens, entry.tokens):
+                best_key, best_score = key, score
+
+        if best_key is None or best_score < self._similarity_threshold:
+            return None
+        return self._get_live_entry(best_key, now)
+
+    # --- Armazenamento e remoção ---
+
+    def _store(self, scope_key: str, exact_key: str, normalized: str, response: str) -> None:
+        key = f"{scope_key}|{normalized}"
+        if key in self._entries:
+            self._remove(key)
+
+        entry = _CacheEntry(key, scope_key, normalized, response, time.monotonic() + self._ttl_seconds)
+        if entry.size_bytes > self._max_bytes:
+            return
+
+        self._entries[key] = entry
+        self._total_bytes += entry.size_bytes
+        self._add_alias(entry, exact_key)
+        for ngram in entry.ngrams:
+            self._ngram_index.setdefault(ngram, set()).add(key)
+
+        while self._entries and (len(self._entries) > self._max_entries or self._total_bytes > self._max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._stats["evictions"] += 1
+
+    def _add_alias(self, entry: _CacheEntry, exact_key: str) -> None:
+        alias = f"{entry.scope}|{exact_key}"
+        if alias in entry.aliases:
+            return
+        entry.aliases.add(alias)
+        self._exact_index[alias] = entry.key
+        entry.size_bytes += sys.getsizeof(alias)
+        self._total_bytes += sys.getsizeof(alias)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.size_bytes
+        for ngram in entry.ngrams:
+            keys = self._ngram_index.get(ngram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._ngram_index[ngram]
+        for raw in entry.aliases:
+            if self._exact_index.get(raw) == key:
+                del self._exact_index[raw]
@@ -0,0 +1,165 @@
+import asyncio
+import math
+import re
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from domain.gateways.chatbot_gateway import ChatHistoryType
+from config.settings import logger
+
+# Palavras e sinais de pontuação, separadamente
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Recebe (user_id, resumo_anterior, interações_novas) e devolve o resumo atualizado
+SummarizerType = Callable[[int, str, ChatHistoryType], Awaitable[str]]
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimativa local do número de tokens de um texto.
+
+    Não usa o tokenizer do modelo: conta cada sinal de pontuação como um
+    token e cada palavra como ~1 token a cada 4 caracteres, o que fica
+    próximo (e um pouco acima) dos tokenizers BPE para português.
+    """
+    return sum(max(1, math.ceil(len(token) / 4)) for token in _TOKEN_RE.findall(text))
+
+
+class _UserState:
+    """Resumo acumulado e contagens de tokens em cache de um usuário."""
+
+    __slots__ = ("summary", "last_summarized_turn", "token_counts", "refresh_task", "history_length")
+
+    def __init__(self):
+        self.summary = ""
+        # Última interação já incorporada ao resumo
+        self.last_summarized_turn: Optional[Tuple[str, str]] = None
+        self.token_counts: Dict[Tuple[str, str], int] = {}
+        self.refresh_task: Optional["asyncio.Task[None]"] = None
+        # Tamanho do histórico na última chamada: a janela da memória só cresce ou
+        # desliza, então um histórico menor significa que ele foi limpo
+        self.history_length = 0
+
+
+class HistoryCompactor:
+    """
+    Limita o histórico enviado ao LLM a um orçamento de tokens.
+
+    As interações mais recentes que cabem em `max_history_tokens` vão
+    completas no prompt. As mais antigas são incorporadas a um resumo por
+    usuário, atualizado em segundo plano e só quando pelo menos
+    `summary_min_turns` interações novas ficaram de fora — não a cada
+    mensagem. Enquanto o resumo é atualizado, o anterior continua em uso.
+
+    O `summarizer` pode ser trocado depois da criação (ex.: para passar pelo
+    scheduler e pelo pool de LLMs montados depois dos backends). As
+    atualizações em andamento são canceladas em `close()`.
+    """
+
+    def __init__(
+        self,
+        max_history_tokens: int = 1500,
+        summary_min_turns: int = 3,
+        summarizer: Optional[SummarizerType] = None,
+        max_users: int = 10000,
+    ):
+        self._max_history_tokens = max_history_tokens
+        self._summary_min_turns = summary_min_turns
+        self.summarizer = summarizer
+        self._max_users = max_users
+        # user_id -> estado; a ordem do OrderedDict é a ordem LRU
+        self._states: "OrderedDict[int, _UserState]" = OrderedDict()
+        # Atualizações de resumo em andamento (inclusive de usuários já removidos do LRU)
+        self._refresh_tasks: "Set[asyncio.Task[None]]" = set()
+
+    def compact(self, user_id: int, history: ChatHistoryType) -> Tuple[str, ChatHistoryType]:
+        """
+        Retorna (resumo, interações_recentes) para montar o prompt.
+
+        O resumo pode estar vazio. Se houver interações suficientes fora do
+        orçamento, agenda a atualização do resumo em segundo plano.
+        """
+        if not history:
+            # Histórico limpo (/start): descarta o resumo antigo
+            self.forget(user_id)
+            return "", history
+
+        state = self._states.get(user_id)
+        if state is not None and len(history) < state.history_length:
+            # Limpo ou removido da memória (ociosidade, orçamento, /start em outra
+            # instância) e recomeçado: o resumo é de uma conversa que não existe mais
+            self.forget(user_id)
+        state = self._get_state(user_id)
+        state.history_length = len(history)
+        token_counts: Dict[Tuple[str, str], int] = {}
+        used = 0
+        start = len(history)
+        for index in range(len(history) - 1, -1, -1):
+            turn = history[index]
+            tokens = state.token_counts.get(turn)
+            if tokens is None:
+                tokens = count_tokens(turn[0]) + count_tokens(turn[1])
+            token_counts[turn] = tokens
+            if used + tokens > self._max_history_tokens:
+                break
+            used += tokens
+            start = index
+        # Guarda só as contagens das interações ainda presentes no histórico
+        state.token_counts = token_counts
+
+        if start > 0:
+            self._maybe_refresh_summary(user_id, state, history, start)
+        return state.summary, history[start:]
+
+    def _get_state(self, user_id: int) -> _UserState:
+        state = self._states.get(user_id)
+        if state is None:
+            state = self._states[user_id] = _UserState()
+            while len(self._states) > self._max_users:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(user_id)
+        return state
+
+    def _maybe_refresh_summary(self, user_id: int, state: _UserState, history: ChatHistoryType, start: int) -> None:
+        if self.summarizer is None:
+            return
+        if state.refresh_task is not None and not state.refresh_task.done():
+            return
+
+        # Interações fora do orçamento (history[:start]) que ainda não estão no resumo.
+        # Se a última resumida já saiu do histórico, todas as que sobraram são novas.
+        new_turns = history[:start]
+        if state.last_summarized_turn is not None:
+            for index in range(len(history) - 1, -1, -1):
+                if history[index] == state.last_summarized_turn:
+                    new_turns = history[index + 1:start]
+                    break
+        if len(new_turns) < self._summary_min_turns:
+            return
+
+        task = asyncio.ensure_future(self._refresh_summary(user_id, state, list(new_turns)))
+        state.refresh_task = task
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    def forget(self, user_id: int) -> None:
+        """Descarta o resumo do usuário (histórico limpo) e cancela a atualização em andamento."""
+        state = self._states.pop(user_id, None)
+        if state is not None and state.refresh_task is not None:
+            state.refresh_task.cancel()
+
+    async def close(self) -> None:
+        """Cancela as atualizações de resumo em andamento e espera elas terminarem."""
+        tasks = list(self._refresh_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _refresh_summary(self, user_id: int, state: _UserState, new_turns: ChatHistoryType) -> None:
+        try:
+            state.summary = await self.summarizer(user_id, state.summary, new_turns)
+            state.last_summarized_turn = new_turns[-1]
+            logger.info(f"Resumo da conversa atualizado para user_id {user_id} (+{len(new_turns)} interações).")
+        except Exception as e:
+            logger.warning(f"Falha ao atualizar o resumo da conversa de user_id {user_id}: {e}")
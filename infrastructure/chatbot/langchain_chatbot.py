@@ -1,60 +1,181 @@
-from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema import HumanMessage, AIMessage
-from typing import List, Tuple
+from langchain.schema import HumanMessage, AIMessage, SystemMessage
+from collections import OrderedDict
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from domain.gateways.chatbot_gateway import ChatbotGateway, ChatHistoryType
+from domain.gateways.chatbot_gateway import ChatbotGateway, ChatHistoryType, StreamInterruptedError
+from infrastructure.chatbot.history_compactor import HistoryCompactor
+from infrastructure.observability.metrics import metrics
 from config import settings # Importa configurações
-from config.settings import logger
+from config.settings import logger, message_logger
 
 class LangchainChatbot(ChatbotGateway):
     """Implementação do ChatbotGateway usando Langchain e Groq."""
 
-    def __init__(self):
-        try:
-            self.llm = ChatGroq(
-                model_name=settings.MODEL_NAME,
-                groq_api_key=settings.GROQ_API_KEY,
-                temperature=0.7
-            )
-            logger.info(f"LLM Langchain/Groq ({settings.MODEL_NAME}) inicializado.")
-        except Exception as e:
-            logger.error(f"Falha ao inicializar o LLM Langchain/Groq: {e}", exc_info=True)
-            raise
+    def __init__(
+        self,
+        llm=None,
+        model_name: Optional[str] = None,
+        api_key: Optional[str] = None,
+        raise_errors: bool = False,
+        history_compactor: Optional[HistoryCompactor] = None
+    ):
+        """
+        Args:
+            llm: Modelo de chat já criado (qualquer objeto com `ainvoke`/`astream`
+                no padrão Langchain). Se None, cria o ChatGroq configurado.
+            model_name: Modelo do Groq a usar (padrão: settings.MODEL_NAME).
+            api_key: Chave da API da Groq (obrigatória quando `llm` é None).
+            raise_errors: Se True, falhas do LLM são propagadas em vez de virar
+                LLM_ERROR_MESSAGE (usado pelo PooledChatbot para tentar outro backend).
+            history_compactor: Compactador compartilhado com outros backends
+                (evita um resumo da conversa por modelo). Se None, cria um próprio,
+                que resume chamando este LLM diretamente.
+        """
+        self.model_name = model_name or settings.MODEL_NAME
+        self._raise_errors = raise_errors
+        if llm is not None:
+            self.llm = llm
+            logger.info(f"LLM fornecido externamente ({type(llm).__name__}).")
+        else:
+            try:
+                # Importado só aqui: com um LLM fornecido (ex.: benchmarks) o SDK da Groq não é carregado
+                from langchain_groq import ChatGroq
+
+                self.llm = ChatGroq(
+                    model_name=self.model_name,
+                    groq_api_key=api_key,
+                    temperature=0.7
+                )
+                logger.info(f"LLM Langchain/Groq ({self.model_name}) inicializado.")
+            except Exception as e:
+                logger.error(f"Falha ao inicializar o LLM Langchain/Groq: {e}", exc_info=True)
+                raise
 
         # Cria o template do prompt uma vez
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", settings.SYSTEM_PROMPT),
+            MessagesPlaceholder(variable_name="conversation_summary"),
+            MessagesPlaceholder(variable_name="knowledge"),
             MessagesPlaceholder(variable_name="chat_history"),
             ("human", "{input}")
         ])
 
-    async def generate_response(self, user_id: int, user_input: str, history: ChatHistoryType) -> str:
+        # Limita o histórico a um orçamento de tokens e resume as interações antigas
+        self.history_compactor = history_compactor or HistoryCompactor(
+            max_history_tokens=settings.HISTORY_MAX_TOKENS,
+            summary_min_turns=settings.HISTORY_SUMMARY_MIN_TURNS,
+            summarizer=self.summarize_history,
+            max_users=settings.HISTORY_CACHE_MAX_USERS
+        )
+        # Cache por usuário das mensagens já formatadas: (input, output) -> (HumanMessage, AIMessage)
+        self._formatted_cache: "OrderedDict[int, Dict[Tuple[str, str], Tuple[HumanMessage, AIMessage]]]" = OrderedDict()
+
+    def _build_prompt(
+        self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None
+    ) -> list:
+        """Compacta e formata o histórico e preenche o template do prompt (com os trechos da base, se houver)."""
+        summary, recent_history = self.history_compactor.compact(user_id, history)
+
+        # Converte o histórico [(str, str)] para o formato [HumanMessage, AIMessage],
+        # reaproveitando as mensagens criadas nas chamadas anteriores do mesmo usuário
+        previous = self._formatted_cache.get(user_id, {})
+        current: Dict[Tuple[str, str], Tuple[HumanMessage, AIMessage]] = {}
+        formatted_history = []
+        for turn in recent_history:
+            messages = previous.get(turn)
+            if messages is None:
+                messages = (HumanMessage(content=turn[0]), AIMessage(content=turn[1]))
+            current[turn] = messages
+            formatted_history.extend(messages)
+        self._remember_formatted(user_id, current)
+
+        # Só os trechos relevantes da base de conhecimento entram no prompt
+        knowledge = []
+        if context:
+            knowledge.append(SystemMessage(content=settings.KNOWLEDGE_PROMPT_PREFIX + "\n".join(f"- {snippet}" for snippet in context)))
+
+        # Prepara o input para o template
+        input_data = {
+            "input": user_input,
+            "conversation_summary": [SystemMessage(content=f"{settings.SUMMARY_PREFIX}{summary}")] if summary else [],
+            "knowledge": knowledge,
+            "chat_history": formatted_history
+        }
+        return self.prompt_template.format_messages(**input_data)
+
+    def _remember_formatted(self, user_id: int, messages: Dict[Tuple[str, str], Tuple[HumanMessage, AIMessage]]) -> None:
+        if not messages:
+            self._formatted_cache.pop(user_id, None)
+            return
+        self._formatted_cache[user_id] = messages
+        self._formatted_cache.move_to_end(user_id)
+        while len(self._formatted_cache) > settings.HISTORY_CACHE_MAX_USERS:
+            self._formatted_cache.popitem(last=False)
+
+    async def summarize_history(self, user_id: int, previous_summary: str, turns: ChatHistoryType) -> str:
+        """Atualiza o resumo da conversa incorporando as interações informadas."""
+        lines = [f"Resumo atual: {previous_summary or '(vazio)'}", "", "Novas interações:"]
+        for human_msg, ai_msg in turns:
+            lines.append(f"Fã: {human_msg}")
+            lines.append(f"Assistente: {ai_msg}")
+        ai_response = await self.llm.ainvoke([
+            SystemMessage(content=settings.SUMMARY_PROMPT),
+            HumanMessage(content="\n".join(lines))
+        ])
+        return ai_response.content.strip()
+
+    async def generate_response(self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None) -> str:
         """Gera resposta usando o LLM com histórico formatado."""
         try:
-            # Converte o histórico [(str, str)] para o formato [HumanMessage, AIMessage]
-            formatted_history = []
-            for human_msg, ai_msg in history:
-                formatted_history.append(HumanMessage(content=human_msg))
-                formatted_history.append(AIMessage(content=ai_msg))
-
-            # Prepara o input para o template
-            input_data = {
-                "input": user_input,
-                "chat_history": formatted_history
-            }
-
             # Cria a cadeia (chain) ou invoca diretamente formatando
             # Para simplicidade, vamos formatar e invocar
-            formatted_prompt = self.prompt_template.format_messages(**input_data)
+            with metrics.span("prompt_format"):
+                formatted_prompt = self._build_prompt(user_id, user_input, history, context)
 
-            logger.info(f"Enviando prompt para LLM (user_id: {user_id})...")
-            ai_response = await self.llm.ainvoke(formatted_prompt) # Usa ainvoke para async
+            message_logger.info("Enviando prompt para LLM (user_id: %s)...", user_id)
+            with metrics.span("llm_call"):
+                ai_response = await self.llm.ainvoke(formatted_prompt) # Usa ainvoke para async
             response_content = ai_response.content
-            logger.info(f"Resposta recebida do LLM (user_id: {user_id}).")
+            message_logger.info("Resposta recebida do LLM (user_id: %s).", user_id)
 
             return response_content
 
         except Exception as e:
             logger.error(f"Erro ao gerar resposta do LLM para user_id {user_id}: {e}", exc_info=True)
-            return "Desculpe, tive um problema interno ao processar sua mensagem. Tente novamente mais tarde. 😥"
\ No newline at end of file
+            metrics.inc("llm_errors_total", help_text="Chamadas ao LLM que falharam")
+            if self._raise_errors:
+                raise
+            return settings.LLM_ERROR_MESSAGE
+
+    async def stream_response(self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """Gera a resposta em streaming (astream), entregando os tokens conforme chegam."""
+        produced_any = False
+        try:
+            with metrics.span("prompt_format"):
+                formatted_prompt = self._build_prompt(user_id, user_input, history, context)
+
+            message_logger.info("Enviando prompt para LLM em streaming (user_id: %s)...", user_id)
+            with metrics.span("llm_call"):
+                started = time.perf_counter()
+                async for chunk in self.llm.astream(formatted_prompt):
+                    if chunk.content:
+                        if not produced_any:
+                            metrics.observe(
+                                "llm_first_token_seconds", time.perf_counter() - started,
+                                "Tempo até o primeiro token do LLM (streaming)"
+                            )
+                        produced_any = True
+                        yield chunk.content
+            message_logger.info("Streaming do LLM concluído (user_id: %s).", user_id)
+
+        except Exception as e:
+            logger.error(f"Erro no streaming do LLM para user_id {user_id}: {e}", exc_info=True)
+            metrics.inc("llm_errors_total", help_text="Chamadas ao LLM que falharam")
+            if produced_any:
+                # A resposta parcial já foi entregue: quem consome precisa saber que ela está incompleta
+                raise StreamInterruptedError(f"Streaming do LLM interrompido: {e}") from e
+            if self._raise_errors:
+                raise
+            yield settings.LLM_ERROR_MESSAGE
@@ -0,0 +1,356 @@
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+
+from domain.gateways.chatbot_gateway import ChatbotGateway, ChatHistoryType, StreamInterruptedError
+from config import settings
+from config.settings import logger
+
+# Estados do circuit breaker
+_CLOSED = "closed"
+_OPEN = "open"
+_HALF_OPEN = "half_open"
+
+
+class _Backend:
+    """Um backend do pool com suas estatísticas recentes e o estado do circuit breaker."""
+
+    __slots__ = (
+        "name", "gateway", "samples", "latency_ewma", "state", "opened_at",
+        "consecutive_failures", "probe_in_flight", "calls", "failures", "hedge_wins",
+    )
+
+    def __init__(self, name: str, gateway: ChatbotGateway, window: int):
+        self.name = name
+        self.gateway = gateway
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window) # (latência, sucesso)
+        self.latency_ewma: Optional[float] = None
+        self.state = _CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.hedge_wins = 0
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def latency_p95(self) -> Optional[float]:
+        latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+class PooledChatbot(ChatbotGateway):
+    """
+    ChatbotGateway que distribui as chamadas entre vários backends (ex.: um
+    LangchainChatbot por modelo) escolhendo o mais rápido que está saudável.
+
+    - Cada backend guarda a latência (média móvel exponencial e p95 de uma
+      janela) e a taxa de erro das últimas `window` chamadas. No streaming,
+      a latência medida é o tempo até o primeiro pedaço.
+    - Circuit breaker: com muitos erros na janela (ou `max_consecutive_failures`
+      seguidos) o backend sai da rotação por `open_seconds`; depois recebe
+      uma chamada de teste (half-open) e volta se ela der certo.
+    - Hedging: se o backend escolhido não responder em `hedge_after` segundos
+      (padrão: o p95 dele, no mínimo `hedge_min_delay`), a mesma chamada é
+      feita no próximo backend e vale a primeira resposta.
+    - Falhas são repetidas no próximo backend; só quando todos falham o
+      usuário recebe LLM_ERROR_MESSAGE.
+
+    Os backends devem propagar as falhas (LangchainChatbot com raise_errors=True).
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Tuple[str, ChatbotGateway]],
+        window: int = 50,
+        error_rate_threshold: float = 0.5,
+        min_samples: int = 5,
+        max_consecutive_failures: int = 3,
+        open_seconds: float = 30.0,
+        hedging: bool = True,
+        hedge_after: Optional[float] = None,
+        hedge_min_delay: float = 1.0,
+        explore_rate: float = 0.05,
+        ewma_alpha: float = 0.2,
+        seed: Optional[int] = None,
+    ):
+        if not backends:
+            raise ValueError("O pool precisa de pelo menos um backend.")
+        self._backends = [_Backend(name, gateway, window) for name, gateway in backends]
+        self._error_rate_threshold = error_rate_threshold
+        self._min_samples = min_samples
+        self._max_consecutive_failures = max_consecutive_failures
+        self._open_seconds = open_seconds
+        self._hedging = hedging and len(self._backends) > 1
+        self._hedge_after = hedge_after
+        self._hedge_min_delay = hedge_min_delay
+        self._explore_rate = explore_rate
+        self._ewma_alpha = ewma_alpha
+        self._random = random.Random(seed)
+        self._stats = {"requests": 0, "hedged_requests": 0, "failovers": 0, "exhausted": 0}
+        logger.info(f"Pool de LLMs inicializado com {len(self._backends)} backends: {[b.name for b in self._backends]}.")
+
+    async def generate_response(
+        self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None
+    ) -> str:
+        """Chama o backend mais rápido e saudável, com hedging e failover."""
+        self._stats["requests"] += 1
+        order = self._route()
+        tasks: Dict["asyncio.Task[str]", _Backend] = {}
+
+        def launch(backend: _Backend) -> None:
+            task = asyncio.ensure_future(
+                self._timed(backend, backend.gateway.generate_response(user_id, user_input, history, context))
+            )
+            tasks[task] = backend
+
+        primary = order.pop(0)
+        launch(primary)
+        hedge_delay = self._hedge_delay(primary) if self._hedging and order else None
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # O backend está demorando: dispara a mesma chamada no próximo
+                    hedge_delay = None
+                    self._stats["hedged_requests"] += 1
+                    launch(order.pop(0))
+                    continue
+                for task in done:
+                    backend = tasks.pop(task)
+                    if task.exception() is None:
+                        if backend is not primary:
+                            backend.hedge_wins += 1
+                        return task.result()
+                    if order:
+                        self._stats["failovers"] += 1
+                        launch(order.pop(0))
+                    if not order:
+                        hedge_delay = None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self._stats["exhausted"] += 1
+        return settings.LLM_ERROR_MESSAGE
+
+    async def stream_response(
+        self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming com a mesma escolha de backend: o hedging e o failover valem
+        até o primeiro pedaço; depois disso o streaming segue no backend que
+        respondeu primeiro (uma falha no meio levanta StreamInterruptedError).
+        """
+        self._stats["requests"] += 1
+        order = self._route()
+        # Task do primeiro pedaço -> (backend, streaming, início)
+        starts: Dict["asyncio.Task[str]", Tuple[_Backend, AsyncIterator[str], float]] = {}
+
+        def launch(backend: _Backend) -> None:
+            self._begin_call(backend)
+            stream = backend.gateway.stream_response(user_id, user_input, history, context).__aiter__()
+            starts[asyncio.ensure_future(stream.__anext__())] = (backend, stream, time.perf_counter())
+
+        primary = order.pop(0)
+        launch(primary)
+        hedge_delay = self._hedge_delay(primary) if self._hedging and order else None
+        winner: Optional[Tuple[_Backend, AsyncIterator[str], float]] = None
+        first_chunk = ""
+        try:
+            while starts and winner is None:
+                done, _ = await asyncio.wait(starts, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_delay = None
+                    self._stats["hedged_requests"] += 1
+                    launch(order.pop(0))
+                    continue
+                for task in done:
+                    backend, stream, started = starts.pop(task)
+                    error = task.exception()
+                    if error is None and winner is None:
+                        winner = (backend, stream, started)
+                        first_chunk = task.result()
+                        self._record(backend, True, time.perf_counter() - started)
+                        if backend is not primary:
+                            backend.hedge_wins += 1
+                        continue
+                    if error is not None:
+                        # StopAsyncIteration (streaming vazio) também conta como falha
+                        self._record(backend, False, time.perf_counter() - started)
+                        logger.warning(f"Backend '{backend.name}' falhou no streaming: {error!r}")
+                    else:
+                        self._end_call(backend)
+                        await stream.aclose()
+                    if winner is None and order:
+                        self._stats["failovers"] += 1
+                        launch(order.pop(0))
+                    if not order:
+                        hedge_delay = None
+        finally:
+            for task, (backend, stream, started) in starts.items():
+                task.cancel()
+                self._record_cancelled(backend, time.perf_counter() - started)
+            for task, (backend, stream, _) in starts.items():
+                try:
+                    await task
+                except BaseException:
+                    pass
+                await stream.aclose()
+
+        if winner is None:
+            self._stats["exhausted"] += 1
+            yield settings.LLM_ERROR_MESSAGE
+            return
+
+        backend, stream, _ = winner
+        yield first_chunk
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            # Resposta parcial já entregue: não dá para trocar de backend, só avisar quem consome
+            logger.error(f"Backend '{backend.name}' falhou no meio do streaming: {e}", exc_info=True)
+            self._record(backend, False, 0.0, latency_known=False)
+            raise StreamInterruptedError(f"Backend '{backend.name}' falhou no meio do streaming") from e
+        finally:
+            await stream.aclose()
+
+    async def summarize_history(self, user_id: int, previous_summary: str, turns: ChatHistoryType) -> str:
+        """Resumo no backend mais rápido e saudável, com failover mas sem hedging (não há usuário esperando)."""
+        last_error: Optional[Exception] = None
+        for backend in self._route():
+            try:
+                return await self._timed(backend, backend.gateway.summarize_history(user_id, previous_summary, turns))
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def get_stats(self) -> Dict[str, float]:
+        """Contadores do pool e, por backend, estado do circuito, latência e taxa de erro."""
+        stats: Dict[str, float] = dict(self._stats)
+        for backend in self._backends:
+            prefix = re.sub(r"[^a-zA-Z0-9_]", "_", backend.name)
+            stats[f"{prefix}_calls"] = backend.calls
+            stats[f"{prefix}_failures"] = backend.failures
+            stats[f"{prefix}_hedge_wins"] = backend.hedge_wins
+            stats[f"{prefix}_error_rate"] = round(backend.error_rate(), 4)
+            stats[f"{prefix}_latency_ewma_ms"] = round((backend.latency_ewma or 0.0) * 1000, 1)
+            stats[f"{prefix}_latency_p95_ms"] = round((backend.latency_p95() or 0.0) * 1000, 1)
+            stats[f"{prefix}_circuit_open"] = 0 if backend.state == _CLOSED else 1
+        return stats
+
+    # --- Roteamento e saúde ---
+
+    def _route(self) -> List[_Backend]:
+        """Backends em ordem de preferência: saudáveis por latência, depois os de teste."""
+        now = time.monotonic()
+        closed = []
+        probes = []
+        for backend in self._backends:
+            if backend.state == _CLOSED:
+                closed.append(backend)
+            elif not backend.probe_in_flight and now - backend.opened_at >= self._open_seconds:
+                backend.state = _HALF_OPEN
+                probes.append(backend)
+
+        # Backends sem medição ainda vão primeiro para serem conhecidos
+        closed.sort(key=lambda b: b.latency_ewma if b.latency_ewma is not None else 0.0)
+        if len(closed) > 1 and self._random.random() < self._explore_rate:
+            # De vez em quando usa o segundo colocado para manter a latência dele atualizada
+            closed[0], closed[1] = closed[1], closed[0]
+
+        # A chamada de teste de um backend em half-open vai na frente; se falhar,
+        # os saudáveis assumem no failover
+        order = probes[:1] + closed + probes[1:]
+        if not order:
+            # Todos com o circuito aberto: tenta mesmo assim, do aberto há mais tempo
+            order = sorted(self._backends, key=lambda b: b.opened_at)
+        return order
+
+    def _hedge_delay(self, backend: _Backend) -> float:
+        if self._hedge_after is not None:
+            return self._hedge_after
+        p95 = backend.latency_p95()
+        return max(self._hedge_min_delay, p95 if p95 is not None else 0.0)
+
+    async def _timed(self, backend: _Backend, call) -> str:
+        self._begin_call(backend)
+        started = time.perf_counter()
+        try:
+            result = await call
+        except asyncio.CancelledError:
+            # Perdeu o hedging (ou o chamador desistiu): não conta como falha
+            self._record_cancelled(backend, time.perf_counter() - started)
+            raise
+        except Exception as e:
+            self._record(backend, False, time.perf_counter() - started)
+            logger.warning(f"Backend '{backend.name}' falhou: {e!r}")
+            raise
+        self._record(backend, True, time.perf_counter() - started)
+        return result
+
+    def _begin_call(self, backend: _Backend) -> None:
+        backend.calls += 1
+        if backend.state == _HALF_OPEN:
+            backend.probe_in_flight = True
+
+    def _end_call(self, backend: _Backend) -> None:
+        backend.probe_in_flight = False
+
+    def _record_cancelled(self, backend: _Backend, elapsed: float) -> None:
+        """
+        Chamada cancelada antes de terminar: a latência real é pelo menos
+        `elapsed`. Sem isso, um backend lento que sempre perde o hedging
+        nunca teria latência medida e continuaria sendo o preferido.
+
+        Uma chamada de teste (half-open) cancelada não prova nada: o circuito
+        volta a abrir por `open_seconds`, senão o backend seria testado de
+        novo na chamada seguinte e toda requisição pagaria o atraso do hedging.
+        """
+        self._end_call(backend)
+        if backend.state == _HALF_OPEN:
+            backend.state = _OPEN
+            backend.opened_at = time.monotonic()
+        if backend.latency_ewma is None or elapsed > backend.latency_ewma:
+            backend.latency_ewma = elapsed if backend.latency_ewma is None else (
+                self._ewma_alpha * elapsed + (1 - self._ewma_alpha) * backend.latency_ewma
+            )
+
+    def _record(self, backend: _Backend, ok: bool, latency: float, latency_known: bool = True) -> None:
+        backend.probe_in_flight = False
+        if latency_known:
+            backend.samples.append((latency, ok))
+        if ok:
+            backend.consecutive_failures = 0
+            backend.latency_ewma = latency if backend.latency_ewma is None else (
+                self._ewma_alpha * latency + (1 - self._ewma_alpha) * backend.latency_ewma
+            )
+            if backend.state != _CLOSED:
+                logger.info(f"Backend '{backend.name}' voltou a responder; circuito fechado.")
+                backend.state = _CLOSED
+                backend.samples.clear()
+            return
+
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        too_many_errors = (
+            len(backend.samples) >= self._min_samples and backend.error_rate() >= self._error_rate_threshold
+        )
+        if backend.state == _HALF_OPEN or too_many_errors or backend.consecutive_failures >= self._max_consecutive_failures:
+            if backend.state != _OPEN:
+                logger.warning(
+                    f"Circuito do backend '{backend.name}' aberto por {self._open_seconds}s "
+                    f"(taxa de erro {backend.error_rate():.0%}, {backend.consecutive_failures} falhas seguidas)."
+                )
+            backend.state = _OPEN
+            backend.opened_at = time.monotonic()
@@ -0,0 +1,86 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
+
+from domain.gateways.chatbot_gateway import ChatbotGateway, ChatHistoryType, StreamInterruptedError
+from infrastructure.scheduler.llm_scheduler import LLMScheduler, QueueFullError, DeadlineExceededError
+from config import settings
+from config.settings import logger
+
+
+class ScheduledChatbot(ChatbotGateway):
+    """
+    ChatbotGateway que passa cada chamada pelo LLMScheduler.
+
+    Quando o scheduler recusa a requisição (fila cheia ou prazo esgotado),
+    devolve uma mensagem amigável em vez de propagar o erro.
+    """
+
+    def __init__(self, inner: ChatbotGateway, scheduler: LLMScheduler, timeout: Optional[float] = None):
+        self._inner = inner
+        self._scheduler = scheduler
+        self._timeout = timeout
+
+    async def generate_response(self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None) -> str:
+        """Agenda a chamada ao gateway interno respeitando o limite de concorrência."""
+        try:
+            return await self._scheduler.submit(
+                user_id,
+                lambda: self._inner.generate_response(user_id, user_input, history, context),
+                timeout=self._timeout
+            )
+        except QueueFullError:
+            return settings.LLM_BUSY_MESSAGE
+        except DeadlineExceededError:
+            logger.warning(f"Prazo esgotado aguardando o LLM para user_id {user_id}.")
+            return settings.LLM_TIMEOUT_MESSAGE
+
+    async def stream_response(self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """Agenda o streaming; a vaga no scheduler fica ocupada até o último pedaço."""
+        chunks: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+        async def pump() -> None:
+            try:
+                async for chunk in self._inner.stream_response(user_id, user_input, history, context):
+                    chunks.put_nowait(chunk)
+            finally:
+                chunks.put_nowait(None) # Sinaliza o fim do streaming
+
+        submitted = asyncio.ensure_future(self._scheduler.submit(user_id, pump, timeout=self._timeout))
+        # Se a requisição for recusada antes de começar, a fila nunca recebe o sinal de fim
+        submitted.add_done_callback(lambda _: chunks.put_nowait(None))
+
+        produced_any = False
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                produced_any = True
+                yield chunk
+            await submitted
+        except QueueFullError:
+            yield settings.LLM_BUSY_MESSAGE
+        except DeadlineExceededError:
+            logger.warning(f"Prazo esgotado no streaming do LLM para user_id {user_id}.")
+            if produced_any:
+                raise StreamInterruptedError("Prazo esgotado no meio do streaming") from None
+            yield settings.LLM_TIMEOUT_MESSAGE
+        finally:
+            if not submitted.done():
+                submitted.cancel()
+
+    async def summarize_history(self, user_id: int, previous_summary: str, turns: ChatHistoryType) -> str:
+        """
+        Resumo em segundo plano, com prioridade baixa no scheduler. Recusas
+        (fila cheia, prazo) são propagadas: o resumo é tentado de novo depois.
+        """
+        return await self._scheduler.submit(
+            user_id,
+            lambda: self._inner.summarize_history(user_id, previous_summary, turns),
+            timeout=self._timeout,
+            background=True
+        )
+
+    def get_stats(self) -> Dict[str, float]:
+        """Retorna as métricas do scheduler (fila, espera, rejeições)."""
+        return self._scheduler.get_stats()
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+from typing import AsyncIterator, Dict, List, Optional
+
+from domain.gateways.chatbot_gateway import ChatbotGateway, ChatHistoryType
+from domain.text_utils import normalize_text
+from config.settings import logger, message_logger
+
+
+class _Flight:
+    """Chamada em andamento ao gateway interno e quantos chamadores ela atende."""
+
+    __slots__ = ("task", "callers")
+
+    def __init__(self, task: "asyncio.Task[str]"):
+        self.task = task
+        self.callers = 1
+
+
+class _StreamFlight:
+    """Streaming em andamento: guarda os pedaços já recebidos para os chamadores que chegarem depois."""
+
+    __slots__ = ("chunks", "done", "error", "changed", "callers", "task")
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+        self.callers = 1
+        self.task: Optional["asyncio.Task[None]"] = None
+
+
+class SingleFlightChatbot(ChatbotGateway):
+    """
+    Agrupa requisições concorrentes equivalentes em uma única chamada ao LLM.
+
+    Duas requisições são equivalentes quando o input normalizado, o
+    histórico inteiro e os trechos da base de conhecimento coincidem: a
+    chamada compartilhada roda com o histórico do primeiro chamador, então
+    uma diferença em qualquer interação (mesmo antiga) mudaria a resposta.
+    Enquanto a primeira chamada está em andamento, as demais aguardam
+    e recebem o mesmo resultado (ou a mesma exceção).
+    """
+
+    def __init__(self, inner: ChatbotGateway):
+        self._inner = inner
+        self._in_flight: Dict[str, _Flight] = {}
+        self._in_flight_streams: Dict[str, _StreamFlight] = {}
+        self._stats = {
+            "requests": 0,
+            "upstream_calls": 0,
+            "coalesced_requests": 0,
+            "max_callers_per_call": 0,
+        }
+        logger.info("Single-flight do chatbot inicializado.")
+
+    async def generate_response(self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None) -> str:
+        """Compartilha a chamada em andamento equivalente ou inicia uma nova."""
+        self._stats["requests"] += 1
+        key = self._make_key(user_input, history, context)
+
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            flight.callers += 1
+            self._stats["coalesced_requests"] += 1
+        else:
+            # A chamada roda em uma task própria para que o cancelamento de um
+            # chamador não cancele a resposta dos outros
+            task = asyncio.ensure_future(self._inner.generate_response(user_id, user_input, history, context))
+            flight = _Flight(task)
+            self._in_flight[key] = flight
+            self._stats["upstream_calls"] += 1
+            task.add_done_callback(lambda t, k=key, f=flight: self._finish_flight(k, f))
+
+        return await asyncio.shield(flight.task)
+
+    async def stream_response(self, user_id: int, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """
+        Compartilha um streaming equivalente em andamento: quem chega depois
+        recebe primeiro os pedaços já gerados e depois acompanha os novos.
+        """
+        self._stats["requests"] += 1
+        key = self._make_key(user_input, history, context)
+
+        flight = self._in_flight_streams.get(key)
+        if flight is not None:
+            flight.callers += 1
+            self._stats["coalesced_requests"] += 1
+        else:
+            flight = _StreamFlight()
+            self._in_flight_streams[key] = flight
+            self._stats["upstream_calls"] += 1
+            flight.task = asyncio.ensure_future(self._pump_stream(key, flight, user_id, user_input, history, context))
+
+        position = 0
+        while True:
+            async with flight.changed:
+                await flight.changed.wait_for(lambda: position < len(flight.chunks) or flight.done)
+                pending = flight.chunks[position:]
+                finished = flight.done
+            for chunk in pending:
+                yield chunk
+            position += len(pending)
+            if finished and position >= len(flight.chunks):
+                break
+
+        if flight.error is not None:
+            raise flight.error
+
+    async def _pump_stream(
+        self, key: str, flight: _StreamFlight, user_id: int, user_input: str, history: ChatHistoryType,
+        context: Optional[List[str]]
+    ) -> None:
+        """Consome o streaming do gateway interno e avisa os chamadores a cada pedaço."""
+        try:
+            async for chunk in self._inner.stream_response(user_id, user_input, history, context):
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if self._in_flight_streams.get(key) is flight:
+                del self._in_flight_streams[key]
+            self._record_callers(flight.callers)
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Retorna quantas chamadas foram feitas ao LLM e quantos chamadores cada uma atendeu."""
+        stats: Dict[str, float] = dict(self._stats)
+        upstream = self._stats["upstream_calls"]
+        stats["avg_callers_per_call"] = self._stats["requests"] / upstream if upstream else 0.0
+        stats["in_flight"] = len(self._in_flight) + len(self._in_flight_streams)
+        return stats
+
+    def _make_key(self, user_input: str, history: ChatHistoryType, context: Optional[List[str]] = None) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(normalize_text(user_input).encode("utf-8"))
+        for human_msg, ai_msg in history:
+            digest.update(b"\x00")
+            digest.update(human_msg.encode("utf-8"))
+            digest.update(b"\x01")
+            digest.update(ai_msg.encode("utf-8"))
+        for snippet in context or []:
+            digest.update(b"\x02")
+            digest.update(snippet.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _finish_flight(self, key: str, flight: _Flight) -> None:
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        self._record_callers(flight.callers)
+        # Marca a exceção como consumida caso todos os chamadores tenham desistido
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def _record_callers(self, callers: int) -> None:
+        if callers > self._stats["max_callers_per_call"]:
+            self._stats["max_callers_per_call"] = callers
+        if callers > 1:
+            message_logger.info("Chamada ao LLM atendeu %s requisições simultâneas.", callers)
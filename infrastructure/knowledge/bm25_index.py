@@ -0,0 +1,124 @@
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from domain.text_utils import normalize_text
+
+# Palavras muito comuns que só aumentariam as listas invertidas
+_STOPWORDS = frozenset({
+    "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos", "e", "em", "na", "no",
+    "nas", "nos", "me", "pra", "para", "por", "com", "que", "qual", "quais", "quem", "como",
+    "se", "ao", "aos", "ou", "mais", "muito", "foi", "ser", "sao", "eh", "ta", "esta",
+    "voce", "tem", "ele", "ela", "eles", "isso", "essa", "esse", "sobre", "pelo", "pela", "ainda",
+    "algum", "alguma",
+})
+
+
+def _stem(token: str) -> str:
+    """Reduz plurais simples ("jogadores" -> "jogador", "jogos" -> "jogo")."""
+    if len(token) > 5 and token.endswith(("res", "zes", "les")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos indexáveis de um texto: normalizado, sem stopwords e com plurais reduzidos."""
+    return [_stem(token) for token in normalize_text(text).split() if token not in _STOPWORDS]
+
+
+class _Document:
+    __slots__ = ("payload", "term_freqs", "length")
+
+    def __init__(self, payload: object, term_freqs: Dict[str, int], length: int):
+        self.payload = payload
+        self.term_freqs = term_freqs
+        self.length = length
+
+
+class BM25Index:
+    """
+    Índice invertido com ranqueamento BM25, em memória.
+
+    Documentos podem ser adicionados e removidos individualmente, então
+    uma alteração em um arquivo da base só reindexa os documentos dele.
+    A busca percorre apenas as listas invertidas dos termos da pergunta.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self._k1 = k1
+        self._b = b
+        self._documents: Dict[int, _Document] = {}
+        self._postings: Dict[str, Dict[int, int]] = {} # termo -> {doc_id: frequência}
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @property
+    def term_count(self) -> int:
+        return len(self._postings)
+
+    def add(self, text: str, payload: object) -> int:
+        """Indexa um documento e retorna seu id."""
+        tokens = tokenize(text)
+        term_freqs: Dict[str, int] = {}
+        for token in tokens:
+            term_freqs[token] = term_freqs.get(token, 0) + 1
+
+        doc_id = self._next_id
+        self._next_id += 1
+        self._documents[doc_id] = _Document(payload, term_freqs, len(tokens))
+        self._total_length += len(tokens)
+        for term, freq in term_freqs.items():
+            self._postings.setdefault(term, {})[doc_id] = freq
+        return doc_id
+
+    def remove(self, doc_ids: Iterable[int]) -> None:
+        for doc_id in doc_ids:
+            document = self._documents.pop(doc_id, None)
+            if document is None:
+                continue
+            self._total_length -= document.length
+            for term in document.term_freqs:
+                posting = self._postings[term]
+                del posting[doc_id]
+                if not posting:
+                    del self._postings[term]
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[object, float, float]]:
+        """
+        Retorna até `top_k` tuplas (payload, nota BM25, confiança).
+
+        A confiança é a fração do IDF da pergunta coberta pelo documento:
+        1.0 quando todos os termos da pergunta aparecem nele, menor quando
+        faltam termos (ou a pergunta tem termos que a base não conhece).
+        """
+        terms = set(tokenize(query))
+        total_docs = len(self._documents)
+        if not terms or not total_docs:
+            return []
+
+        avg_length = self._total_length / total_docs or 1.0
+        scores: Dict[int, float] = {}
+        matched_idf: Dict[int, float] = {}
+        query_idf = 0.0
+        for term in terms:
+            posting: Optional[Dict[int, int]] = self._postings.get(term)
+            doc_freq = len(posting) if posting else 0
+            idf = math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            query_idf += idf
+            if not posting:
+                continue
+            for doc_id, freq in posting.items():
+                length_norm = 1 - self._b + self._b * self._documents[doc_id].length / avg_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self._k1 + 1) / (freq + self._k1 * length_norm)
+                matched_idf[doc_id] = matched_idf.get(doc_id, 0.0) + idf
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [
+            (self._documents[doc_id].payload, score, matched_idf[doc_id] / query_idf)
+            for doc_id, score in best
+        ]
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from domain.gateways.knowledge_base_gateway import KnowledgeBaseGateway, KnowledgeSnippet
+from infrastructure.knowledge.bm25_index import BM25Index
+from config.settings import logger
+
+_SUPPORTED_EXTENSIONS = (".json", ".md")
+_HEADING_RE = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$")
+
+# (título, texto, perguntas de exemplo)
+_Entry = Tuple[str, str, List[str]]
+# Identifica uma versão do arquivo sem lê-lo
+_FileStamp = Tuple[int, int]
+
+
+def _parse_json(content: str) -> List[_Entry]:
+    """
+    Lista de objetos {"title", "text", "questions"}; "questions" (opcional)
+    são formas de perguntar pelo fato, indexadas junto com o texto.
+    """
+    entries = []
+    for item in json.loads(content):
+        text = str(item.get("text", "")).strip()
+        if text:
+            entries.append((str(item.get("title", "")).strip(), text, [str(q) for q in item.get("questions", [])]))
+    return entries
+
+
+def _parse_markdown(content: str) -> List[_Entry]:
+    """Cada seção (título + parágrafos até o próximo título) vira uma entrada."""
+    entries = []
+    title = ""
+    lines: List[str] = []
+
+    def flush() -> None:
+        text = "\n".join(lines).strip()
+        if text:
+            entries.append((title, text, []))
+
+    for line in content.splitlines():
+        heading = _HEADING_RE.match(line)
+        if heading:
+            flush()
+            title, lines = heading.group(1), []
+        else:
+            lines.append(line)
+    flush()
+    return entries
+
+
+def _load_file(path: str) -> List[_Entry]:
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    return _parse_json(content) if path.endswith(".json") else _parse_markdown(content)
+
+
+class FileKnowledgeBase(KnowledgeBaseGateway):
+    """
+    Base de conhecimento lida de arquivos JSON e Markdown de um diretório,
+    indexada em memória com BM25.
+
+    Os arquivos são carregados na criação. Com `reload_interval` > 0, uma
+    tarefa verifica periodicamente a data de modificação dos arquivos e
+    reindexa só os que mudaram (ou foram criados/removidos).
+    """
+
+    def __init__(self, directory: str, reload_interval: float = 0.0):
+        self._directory = directory
+        self._reload_interval = reload_interval
+        self._index = BM25Index()
+        self._files: Dict[str, Tuple[_FileStamp, List[int]]] = {} # caminho -> (versão, ids no índice)
+        self._reload_task: Optional[asyncio.Task] = None
+        self._reloads = 0
+
+        self._apply_changes(self._scan())
+        logger.info(
+            f"Base de conhecimento carregada de '{directory}': {len(self._index)} trechos, "
+            f"{len(self._files)} arquivos."
+        )
+
+    def search(self, query: str, top_k: int = 3) -> List[KnowledgeSnippet]:
+        return [
+            KnowledgeSnippet(title=title, text=text, score=score, confidence=confidence, source=source)
+            for (title, text, source), score, confidence in self._index.search(query, top_k)
+        ]
+
+    async def start(self) -> None:
+        if self._reload_interval > 0 and self._reload_task is None:
+            self._reload_task = asyncio.create_task(self._reload_loop())
+
+    async def close(self) -> None:
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            try:
+                await self._reload_task
+            except asyncio.CancelledError:
+                pass
+            self._reload_task = None
+
+    async def reload(self) -> int:
+        """Relê os arquivos alterados (fora do event loop) e retorna quantos mudaram."""
+        changes = await asyncio.to_thread(self._scan)
+        # O índice só é alterado aqui, no event loop, para não concorrer com as buscas
+        self._apply_changes(changes)
+        return len(changes)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "documents": len(self._index),
+            "terms": self._index.term_count,
+            "files": len(self._files),
+            "reloads": self._reloads,
+        }
+
+    async def _reload_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._reload_interval)
+            try:
+                changed = await self.reload()
+                if changed:
+                    logger.info(f"Base de conhecimento reindexada ({changed} arquivos alterados).")
+            except Exception as e:
+                logger.error(f"Erro ao recarregar a base de conhecimento: {e}", exc_info=True)
+
+    def _scan(self) -> List[Tuple[str, Optional[_FileStamp], List[_Entry]]]:
+        """Lista os arquivos novos, alterados (com o conteúdo já lido) e removidos (versão None)."""
+        changes = []
+        seen = set()
+        if os.path.isdir(self._directory):
+            for name in sorted(os.listdir(self._directory)):
+                if not name.endswith(_SUPPORTED_EXTENSIONS):
+                    continue
+                path = os.path.join(self._directory, name)
+                try:
+                    stat = os.stat(path)
+                    stamp = (stat.st_mtime_ns, stat.st_size)
+                    seen.add(path)
+                    current = self._files.get(path)
+                    if current is not None and current[0] == stamp:
+                        continue
+                    changes.append((path, stamp, _load_file(path)))
+                except (OSError, ValueError, AttributeError) as e:
+                    # Arquivo inválido (ou sendo escrito): mantém a versão anterior
+                    logger.warning(f"Arquivo da base de conhecimento ignorado ({path}): {e}")
+        else:
+            logger.warning(f"Diretório da base de conhecimento não encontrado: {self._directory}")
+        for path in self._files:
+            if path not in seen:
+                changes.append((path, None, []))
+        return changes
+
+    def _apply_changes(self, changes: List[Tuple[str, Optional[_FileStamp], List[_Entry]]]) -> None:
+        for path, stamp, entries in changes:
+            previous = self._files.pop(path, None)
+            if previous is not None:
+                self._index.remove(previous[1])
+            if stamp is None:
+                continue
+            source = os.path.basename(path)
+            doc_ids = [
+                # Título e perguntas de exemplo também contam na busca
+                self._index.add(" ".join([title, text, *questions]), (title, text, source))
+                for title, text, questions in entries
+            ]
+            self._files[path] = (stamp, doc_ids)
+        if changes:
+            self._reloads += 1
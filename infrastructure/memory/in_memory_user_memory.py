@@ -1,39 +1,134 @@
+import sys
+import time
 from typing import Dict, List, Tuple
-from collections import deque # Fila para limitar o tamanho da memória
+from collections import OrderedDict, deque # Fila para limitar o tamanho da memória
 
 from domain.gateways.memory_gateway import MemoryGateway, ChatHistoryType
 from config.settings import logger
 
+# Overhead aproximado (em bytes) de cada tupla/posição do deque, além das strings
+_TURN_OVERHEAD_BYTES = sys.getsizeof((None, None)) + 8
+_RECORD_OVERHEAD_BYTES = 640 # deque vazio + registro + entrada no dicionário
+
+
+class _UserRecord:
+    """Histórico de um usuário (com __slots__ para reduzir memória por usuário)."""
+
+    __slots__ = ("turns", "last_access", "size_bytes")
+
+    def __init__(self, max_history_size: int, now: float):
+        self.turns: deque = deque(maxlen=max_history_size)
+        self.last_access = now
+        self.size_bytes = _RECORD_OVERHEAD_BYTES
+
+
+def _turn_size(turn: Tuple[str, str]) -> int:
+    return sys.getsizeof(turn[0]) + sys.getsizeof(turn[1]) + _TURN_OVERHEAD_BYTES
+
+
 class InMemoryUserMemory(MemoryGateway):
-    """Implementação da memória que guarda o histórico em um dicionário na RAM."""
+    """
+    Implementação da memória que guarda o histórico em um dicionário na RAM.
 
-    def __init__(self, max_history_size: int = 15):
+    Usuários ociosos há mais de `idle_ttl_seconds` são removidos e, se o
+    total estimado passar de `max_total_bytes`, os usuários menos recentes
+    (LRU) são removidos até voltar ao orçamento.
+    """
+
+    def __init__(self, max_history_size: int = 15, idle_ttl_seconds: float = 6 * 3600, max_total_bytes: int = 64 * 1024 * 1024):
         # Dicionário para guardar a memória de cada usuário
-        # A chave é user_id, o valor é um deque (fila) de tuplas (input, output)
-        self._user_memory: Dict[int, deque[Tuple[str, str]]] = {}
+        # A chave é user_id, o valor é o registro com o deque (fila) de tuplas (input, output).
+        # A ordem do OrderedDict é a ordem de acesso: o primeiro é o mais ocioso.
+        self._user_memory: "OrderedDict[int, _UserRecord]" = OrderedDict()
         self._max_history_size = max_history_size
-        logger.info(f"Memória em RAM inicializada (máx. {max_history_size} interações por usuário).")
+        self._idle_ttl_seconds = idle_ttl_seconds
+        self._max_total_bytes = max_total_bytes
+        self._total_bytes = 0
+        self._evicted_idle = 0
+        self._evicted_budget = 0
+        logger.info(
+            f"Memória em RAM inicializada (máx. {max_history_size} interações por usuário, "
+            f"ociosidade {idle_ttl_seconds}s, orçamento {max_total_bytes} bytes)."
+        )
 
     async def get_history(self, user_id: int) -> ChatHistoryType:
         """Recupera o histórico como uma lista de tuplas."""
-        if user_id in self._user_memory:
+        now = time.monotonic()
+        self._evict_idle(now)
+        record = self._user_memory.get(user_id)
+        if record is not None:
+            record.last_access = now
+            self._user_memory.move_to_end(user_id)
             # Converte o deque para lista antes de retornar
-            return list(self._user_memory[user_id])
+            return list(record.turns)
         return []
 
     async def add_interaction(self, user_id: int, user_input: str, bot_output: str) -> None:
         """Adiciona interação, garantindo que o usuário exista e respeitando o limite."""
-        if user_id not in self._user_memory:
-            # Cria um deque com tamanho máximo para o novo usuário
-            self._user_memory[user_id] = deque(maxlen=self._max_history_size)
+        now = time.monotonic()
+        self._evict_idle(now)
+        record = self._user_memory.get(user_id)
+        if record is None:
+            # Cria um registro com deque de tamanho máximo para o novo usuário
+            record = self._user_memory[user_id] = _UserRecord(self._max_history_size, now)
+            self._total_bytes += record.size_bytes
+        else:
+            self._user_memory.move_to_end(user_id)
+        record.last_access = now
+
+        if len(record.turns) == record.turns.maxlen:
+            # O deque vai descartar a interação mais antiga
+            dropped = _turn_size(record.turns[0])
+            record.size_bytes -= dropped
+            self._total_bytes -= dropped
+
+        # Respostas predefinidas se repetem muito: intern evita cópias da mesma string
+        turn = (user_input, sys.intern(bot_output))
+        record.turns.append(turn)
+        added = _turn_size(turn)
+        record.size_bytes += added
+        self._total_bytes += added
+        # logger.debug(f"Interação adicionada para user_id {user_id}. Histórico atual: {list(record.turns)}")
 
-        self._user_memory[user_id].append((user_input, bot_output))
-        # logger.debug(f"Interação adicionada para user_id {user_id}. Histórico atual: {list(self._user_memory[user_id])}")
+        self._evict_over_budget(keep_user_id=user_id)
 
     async def clear_history(self, user_id: int) -> None:
-        """Limpa o histórico do usuário, se existir."""
-        if user_id in self._user_memory:
-            self._user_memory[user_id].clear()
+        """Limpa o histórico do usuário, se existir (remove o usuário da memória)."""
+        record = self._user_memory.pop(user_id, None)
+        if record is not None:
+            self._total_bytes -= record.size_bytes
             logger.info(f"Histórico limpo para user_id {user_id}.")
         else:
-            logger.warning(f"Tentativa de limpar histórico para user_id {user_id} inexistente.")
\ No newline at end of file
+            logger.warning(f"Tentativa de limpar histórico para user_id {user_id} inexistente.")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna o número de usuários em memória e o total estimado de bytes."""
+        return {
+            "users": len(self._user_memory),
+            "estimated_bytes": self._total_bytes,
+            "evicted_idle": self._evicted_idle,
+            "evicted_budget": self._evicted_budget,
+        }
+
+    # --- Remoção de usuários ---
+
+    def _evict_idle(self, now: float) -> None:
+        """Remove usuários ociosos; como o dicionário está em ordem de acesso, para no primeiro ativo."""
+        cutoff = now - self._idle_ttl_seconds
+        while self._user_memory:
+            user_id, record = next(iter(self._user_memory.items()))
+            if record.last_access > cutoff:
+                break
+            self._user_memory.popitem(last=False)
+            self._total_bytes -= record.size_bytes
+            self._evicted_idle += 1
+
+    def _evict_over_budget(self, keep_user_id: int) -> None:
+        """Remove os usuários menos recentes até o total estimado caber no orçamento."""
+        while self._total_bytes > self._max_total_bytes and len(self._user_memory) > 1:
+            user_id, record = next(iter(self._user_memory.items()))
+            if user_id == keep_user_id:
+                break
+            self._user_memory.popitem(last=False)
+            self._total_bytes -= record.size_bytes
+            self._evicted_budget += 1
@@ -0,0 +1,224 @@
+import asyncio
+import os
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+from domain.gateways.memory_gateway import MemoryGateway, ChatHistoryType
+from config.settings import logger
+
+# (user_id, user_input, bot_output, created_at)
+_PendingRow = Tuple[int, str, str, float]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    user_input TEXT NOT NULL,
+    bot_output TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_user ON interactions (user_id, id);
+"""
+
+
+class _Shard:
+    """Um arquivo SQLite com sua fila de gravações pendentes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        # Outro processo pode estar gravando no mesmo arquivo
+        self.connection.execute("PRAGMA busy_timeout=5000")
+        self.connection.executescript(_SCHEMA)
+        # Serializa flush/leitura/limpeza deste shard (a conexão é usada em uma thread por vez)
+        self.lock = asyncio.Lock()
+        self.pending: List[_PendingRow] = []
+        self.flush_task: Optional["asyncio.Task[None]"] = None
+
+    # --- Operações bloqueantes (executadas via asyncio.to_thread) ---
+
+    def load(self, user_id: int, limit: int) -> List[Tuple[str, str]]:
+        rows = self.connection.execute(
+            "SELECT user_input, bot_output FROM interactions WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            (user_id, limit)
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    def write(self, batch: List[_PendingRow], max_history_size: int) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO interactions (user_id, user_input, bot_output, created_at) VALUES (?, ?, ?, ?)",
+                batch
+            )
+            # Mantém só as últimas `max_history_size` interações de cada usuário afetado
+            for user_id in {row[0] for row in batch}:
+                self.connection.execute(
+                    "DELETE FROM interactions WHERE user_id = ? AND id <= ("
+                    "SELECT id FROM interactions WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (user_id, user_id, max_history_size)
+                )
+
+    def delete(self, user_id: int) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM interactions WHERE user_id = ?", (user_id,))
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class SqliteUserMemory(MemoryGateway):
+    """
+    Memória persistente em SQLite (modo WAL), dividida em shards por user_id.
+
+    - Opcionalmente, os usuários recentes ficam em um cache LRU em RAM
+      (`hot_users`, desativado por padrão).
+    - `add_interaction` não toca no disco: a interação entra em uma fila
+      (write-behind) que é gravada em lote a cada `flush_interval` segundos
+      ou quando a fila de um shard atinge `flush_batch_size`.
+    - Todo acesso ao SQLite roda em threads (asyncio.to_thread), sem
+      bloquear o event loop.
+
+    Vários processos podem compartilhar o mesmo diretório. Sem o cache em
+    RAM, cada leitura vai ao banco e enxerga o que as outras instâncias já
+    gravaram (a fila write-behind de outro processo só aparece depois do
+    flush, em até `flush_interval`). O cache só é consistente com uma
+    única instância ou se as mensagens de um usuário forem sempre para a
+    mesma instância; com várias instâncias ele serviria histórico velho.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        shards: int = 4,
+        max_history_size: int = 15,
+        hot_users: int = 0,
+        flush_interval: float = 1.0,
+        flush_batch_size: int = 100,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self._shards = [_Shard(os.path.join(directory, f"memory_{i}.db")) for i in range(shards)]
+        self._max_history_size = max_history_size
+        self._hot_users = hot_users
+        self._flush_interval = flush_interval
+        self._flush_batch_size = flush_batch_size
+
+        # user_id -> últimas interações; a ordem do OrderedDict é a ordem LRU
+        self._hot_cache: "OrderedDict[int, Deque[Tuple[str, str]]]" = OrderedDict()
+        self._flush_loop_task: Optional["asyncio.Task[None]"] = None
+        logger.info(
+            f"Memória SQLite inicializada em '{directory}' ({shards} shards, máx. {max_history_size} "
+            f"interações por usuário, {hot_users} usuários em cache)."
+        )
+
+    async def start(self) -> None:
+        """Inicia a gravação periódica da fila write-behind."""
+        if self._flush_loop_task is None:
+            self._flush_loop_task = asyncio.ensure_future(self._flush_loop())
+
+    async def close(self) -> None:
+        """Grava tudo o que está pendente e fecha os arquivos."""
+        if self._flush_loop_task is not None:
+            self._flush_loop_task.cancel()
+            try:
+                await self._flush_loop_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_loop_task = None
+        for shard in self._shards:
+            if shard.flush_task is not None:
+                await asyncio.gather(shard.flush_task, return_exceptions=True)
+            await self._flush_shard(shard)
+            shard.close()
+        logger.info("Memória SQLite gravada e fechada.")
+
+    async def get_history(self, user_id: int) -> ChatHistoryType:
+        """Recupera o histórico do cache em RAM ou, se necessário, do SQLite."""
+        cached = self._hot_cache.get(user_id)
+        if cached is not None:
+            self._hot_cache.move_to_end(user_id)
+            return list(cached)
+
+        shard = self._shard_for(user_id)
+        async with shard.lock:
+            rows = await asyncio.to_thread(shard.load, user_id, self._max_history_size)
+            # Com o lock, tudo que não está no banco ainda está na fila pendente
+            history: Deque[Tuple[str, str]] = deque(rows, maxlen=self._max_history_size)
+            history.extend((row[1], row[2]) for row in shard.pending if row[0] == user_id)
+            self._remember(user_id, history)
+        return list(history)
+
+    async def add_interaction(self, user_id: int, user_input: str, bot_output: str) -> None:
+        """Atualiza o cache em RAM e enfileira a gravação em disco."""
+        cached = self._hot_cache.get(user_id)
+        if cached is not None:
+            cached.append((user_input, bot_output))
+            self._hot_cache.move_to_end(user_id)
+
+        shard = self._shard_for(user_id)
+        shard.pending.append((user_id, user_input, bot_output, time.time()))
+        if len(shard.pending) >= self._flush_batch_size:
+            self._schedule_flush(shard)
+
+    async def clear_history(self, user_id: int) -> None:
+        """Remove o histórico do usuário do cache, da fila pendente e do disco."""
+        self._hot_cache.pop(user_id, None)
+        shard = self._shard_for(user_id)
+        async with shard.lock:
+            shard.pending = [row for row in shard.pending if row[0] != user_id]
+            await asyncio.to_thread(shard.delete, user_id)
+        logger.info(f"Histórico limpo para user_id {user_id}.")
+
+    # --- Internos ---
+
+    def _shard_for(self, user_id: int) -> _Shard:
+        return self._shards[user_id % len(self._shards)]
+
+    def _remember(self, user_id: int, history: Deque[Tuple[str, str]]) -> None:
+        if self._hot_users <= 0:
+            return
+        self._hot_cache[user_id] = history
+        self._hot_cache.move_to_end(user_id)
+        while len(self._hot_cache) > self._hot_users:
+            self._hot_cache.popitem(last=False)
+
+    def _schedule_flush(self, shard: _Shard) -> None:
+        if shard.flush_task is None or shard.flush_task.done():
+            shard.flush_task = asyncio.ensure_future(self._flush_shard(shard))
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            for shard in self._shards:
+                if shard.pending:
+                    await self._flush_shard(shard)
+
+    async def _flush_shard(self, shard: _Shard) -> None:
+        async with shard.lock:
+            if not shard.pending:
+                return
+            batch, shard.pending = shard.pending, []
+            write = asyncio.ensure_future(asyncio.to_thread(shard.write, batch, self._max_history_size))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # A thread continua gravando mesmo com o cancelamento: espera ela terminar
+                # (a conexão não pode ser fechada no meio) antes de soltar o lock
+                await asyncio.wait([write])
+                self._requeue_if_failed(shard, batch, write)
+                raise
+            except Exception:
+                self._requeue_if_failed(shard, batch, write)
+
+    @staticmethod
+    def _requeue_if_failed(shard: _Shard, batch: List[_PendingRow], write: "asyncio.Future[None]") -> None:
+        error = write.exception()
+        if error is None:
+            return
+        logger.error(f"Erro ao gravar {len(batch)} interações em '{shard.path}': {error}", exc_info=error)
+        # Devolve o lote para a fila para tentar de novo no próximo flush
+        shard.pending = batch + shard.pending
@@ -0,0 +1,32 @@
+from domain.gateways.memory_gateway import MemoryGateway, ChatHistoryType
+from infrastructure.observability.metrics import MetricsRegistry
+
+
+class InstrumentedMemoryGateway(MemoryGateway):
+    """Repassa as chamadas para outro MemoryGateway medindo a duração de cada uma."""
+
+    def __init__(self, inner: MemoryGateway, registry: MetricsRegistry):
+        self._inner = inner
+        self._registry = registry
+
+    async def get_history(self, user_id: int) -> ChatHistoryType:
+        with self._registry.span("history_fetch"):
+            return await self._inner.get_history(user_id)
+
+    async def add_interaction(self, user_id: int, user_input: str, bot_output: str) -> None:
+        with self._registry.span("memory_write"):
+            await self._inner.add_interaction(user_id, user_input, bot_output)
+
+    async def clear_history(self, user_id: int) -> None:
+        await self._inner.clear_history(user_id)
+
+    async def start(self) -> None:
+        await self._inner.start()
+
+    async def close(self) -> None:
+        await self._inner.close()
+
+    def get_stats(self):
+        """Repassa as estatísticas da memória interna, se ela tiver."""
+        get_stats = getattr(self._inner, "get_stats", None)
+        return get_stats() if get_stats is not None else {}
@@ -0,0 +1,164 @@
+import contextvars
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config.settings import logger, message_logger
+
+# Limites (em segundos) dos buckets dos histogramas de duração
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Identificador da requisição em andamento (propagado entre corrotinas pelo contextvars)
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+_LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels_key(labels: Dict[str, str]) -> _LabelsKey:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key: _LabelsKey, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        for index, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[index] += 1
+                break
+
+
+class MetricsRegistry:
+    """
+    Métricas em memória (contadores, gauges e histogramas) com saída no
+    formato texto do Prometheus.
+
+    Tudo roda no event loop, então não há locks; cada registro custa
+    algumas operações de dicionário, o que permite deixar ligado sempre.
+    """
+
+    def __init__(self, namespace: str = "furia"):
+        self._namespace = namespace
+        self._counters: Dict[str, Dict[_LabelsKey, float]] = {}
+        self._gauges: Dict[str, Dict[_LabelsKey, float]] = {}
+        self._histograms: Dict[str, Dict[_LabelsKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        # prefixo -> função que devolve {nome: valor} (ex.: get_stats de um componente)
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self.trace_logging = False
+
+    # --- Registro ---
+
+    def inc(self, name: str, value: float = 1.0, help_text: str = "", **labels: str) -> None:
+        series = self._counters.setdefault(self._full_name(name, help_text), {})
+        key = _labels_key(labels)
+        series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, help_text: str = "", **labels: str) -> None:
+        self._gauges.setdefault(self._full_name(name, help_text), {})[_labels_key(labels)] = value
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels: str) -> None:
+        series = self._histograms.setdefault(self._full_name(name, help_text), {})
+        key = _labels_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = _Histogram(DEFAULT_BUCKETS)
+        histogram.observe(value)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Mede a duração de um trecho do caminho da mensagem (histograma `span_seconds`)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("span_seconds", elapsed, "Duração de cada etapa do processamento de mensagens", span=name)
+            if self.trace_logging:
+                message_logger.debug("trace=%s span=%s %.1fms", _trace_id.get(), name, elapsed * 1000)
+
+    def register_collector(self, prefix: str, collector: Callable[[], Dict[str, float]]) -> None:
+        """Exporta como gauges os valores numéricos devolvidos por `collector` a cada coleta."""
+        self._collectors[prefix] = collector
+
+    # --- Trace IDs ---
+
+    @staticmethod
+    def new_trace_id() -> str:
+        """Gera e define o trace ID da requisição atual."""
+        trace_id = uuid.uuid4().hex[:16]
+        _trace_id.set(trace_id)
+        return trace_id
+
+    @staticmethod
+    def current_trace_id() -> Optional[str]:
+        return _trace_id.get()
+
+    # --- Exportação ---
+
+    def render(self) -> str:
+        """Gera o texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        lines: List[str] = []
+        for name, series in self._counters.items():
+            self._header(lines, name, "counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, series in self._gauges.items():
+            self._header(lines, name, "gauge")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, series in self._histograms.items():
+            self._header(lines, name, "histogram")
+            for key, histogram in series.items():
+                cumulative = 0
+                for limit, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    bucket_label = 'le="%s"' % limit
+                    lines.append(f"{name}_bucket{_format_labels(key, bucket_label)} {cumulative}")
+                inf_label = 'le="+Inf"'
+                lines.append(f"{name}_bucket{_format_labels(key, inf_label)} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.total}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        for prefix, collector in self._collectors.items():
+            try:
+                values = collector()
+            except Exception as e:
+                logger.warning(f"Falha ao coletar métricas de '{prefix}': {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = f"{self._namespace}_{prefix}_{key}"
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _full_name(self, name: str, help_text: str) -> str:
+        full_name = f"{self._namespace}_{name}"
+        if help_text and full_name not in self._help:
+            self._help[full_name] = help_text
+        return full_name
+
+    def _header(self, lines: List[str], name: str, metric_type: str) -> None:
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+
+# Registro único usado por todo o bot
+metrics = MetricsRegistry()
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from aiohttp import web
+
+from infrastructure.observability.metrics import MetricsRegistry
+from config.settings import logger
+
+# Content-Type do formato texto do Prometheus
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsServer:
+    """Servidor HTTP local (aiohttp) que expõe as métricas em GET /metrics."""
+
+    def __init__(self, registry: MetricsRegistry, listen: str = "127.0.0.1", port: int = 9100, path: str = "/metrics"):
+        self._registry = registry
+        self._listen = listen
+        self._port = port
+        self._runner: Optional[web.AppRunner] = None
+        self.web_app = web.Application()
+        self.web_app.router.add_get(path, self.handle_metrics)
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self._registry.render().encode("utf-8"), headers={"Content-Type": _CONTENT_TYPE})
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.web_app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._listen, self._port).start()
+        logger.info(f"Métricas disponíveis em http://{self._listen}:{self._port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config.settings import logger
+
+# Fases medidas de cada componente, na ordem em que aparecem no relatório
+PHASES = ("import", "init", "start")
+
+
+class StartupReport:
+    """
+    Tempo gasto por componente na partida do bot: importação dos módulos
+    (bibliotecas pesadas só são importadas quando o componente é usado),
+    criação dos objetos e inicialização assíncrona (on_startup).
+    """
+
+    def __init__(self):
+        self._created = time.perf_counter()
+        # componente -> {fase: segundos}; dict mantém a ordem de criação
+        self._components: Dict[str, Dict[str, float]] = {}
+        self._finished_at: Optional[float] = None
+
+    @contextmanager
+    def measure(self, component: str, phase: str = "init") -> Iterator[None]:
+        """Soma a duração do bloco na fase `phase` do componente."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases = self._components.setdefault(component, {})
+            phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - started
+
+    def finish(self) -> None:
+        """Marca a aplicação como pronta e registra o relatório no log."""
+        self._finished_at = time.perf_counter()
+        lines = [f"Partida concluída em {(self._finished_at - self._created) * 1000:.0f}ms:"]
+        for component, phases in self._sorted_components():
+            detail = ", ".join(f"{phase} {phases[phase] * 1000:.1f}ms" for phase in PHASES if phase in phases)
+            lines.append(f"  {component:<16} {sum(phases.values()) * 1000:8.1f}ms ({detail})")
+        logger.info("\n".join(lines))
+
+    def get_stats(self) -> Dict[str, float]:
+        """Milissegundos por componente/fase e o total até a aplicação ficar pronta."""
+        stats: Dict[str, float] = {}
+        for component, phases in self._components.items():
+            for phase, seconds in phases.items():
+                stats[f"{component}_{phase}_ms"] = round(seconds * 1000, 1)
+        if self._finished_at is not None:
+            stats["total_ms"] = round((self._finished_at - self._created) * 1000, 1)
+        return stats
+
+    def _sorted_components(self) -> List[Tuple[str, Dict[str, float]]]:
+        return sorted(self._components.items(), key=lambda item: sum(item[1].values()), reverse=True)
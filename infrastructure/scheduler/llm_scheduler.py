@@ -0,0 +1,227 @@
+import asyncio
+import contextvars
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from config.settings import logger
+
+T = TypeVar("T")
+
+
+class SchedulerRejectedError(Exception):
+    """Requisição recusada pelo scheduler (fila cheia ou prazo esgotado)."""
+
+
+class QueueFullError(SchedulerRejectedError):
+    """A fila do scheduler atingiu o limite configurado."""
+
+
+class DeadlineExceededError(SchedulerRejectedError):
+    """A requisição não foi concluída dentro do prazo."""
+
+
+class _Job:
+    """Trabalho enfileirado no scheduler."""
+
+    __slots__ = ("user_id", "factory", "future", "enqueued_at", "deadline", "background", "context")
+
+    def __init__(
+        self, user_id: int, factory: Callable[[], Awaitable[Any]], future: asyncio.Future, deadline: float,
+        background: bool = False
+    ):
+        self.user_id = user_id
+        self.factory = factory
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+        self.background = background
+        # Contexto de quem enfileirou (trace ID etc.): o job roda nele, não no de
+        # quem por acaso o despachou (em geral o job anterior que acabou de terminar)
+        self.context = contextvars.copy_context()
+
+
+class LLMScheduler:
+    """
+    Scheduler com concorrência limitada para chamadas ao LLM.
+
+    - No máximo `max_in_flight` chamadas executam ao mesmo tempo.
+    - As demais esperam em uma fila limitada (`max_queue_size`); se ela
+      estiver cheia a requisição é recusada na hora (QueueFullError).
+    - Cada requisição tem um prazo; se ele vencer, DeadlineExceededError.
+    - A fila é justa entre usuários: cada usuário tem sua própria fila
+      e a vez de executar circula entre eles (round-robin), então um
+      usuário enviando muitas mensagens não bloqueia os outros.
+    - Trabalhos em segundo plano (`background=True`, ex.: resumo do
+      histórico) têm prioridade baixa: ficam em uma fila própria, só começam
+      quando não há requisição de usuário esperando e ocupam no máximo
+      `max_background_in_flight` vagas.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        max_queue_size: int = 200,
+        default_timeout: float = 30.0,
+        max_background_in_flight: int = 1
+    ):
+        self._max_in_flight = max_in_flight
+        self._max_queue_size = max_queue_size
+        self._default_timeout = default_timeout
+        self._max_background_in_flight = max_background_in_flight
+
+        # user_id -> fila de jobs; a ordem do OrderedDict define a vez de cada usuário
+        self._queues: "OrderedDict[int, Deque[_Job]]" = OrderedDict()
+        self._queued = 0
+        self._in_flight = 0
+        # Fila única (FIFO) dos trabalhos em segundo plano; não conta em `_queued`
+        self._background: Deque[_Job] = deque()
+        self._background_in_flight = 0
+
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected_queue_full": 0,
+            "expired": 0,
+            "cancelled": 0,
+            "max_queue_depth": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+        logger.info(
+            f"Scheduler do LLM inicializado (máx. {max_in_flight} em execução, fila de {max_queue_size}, "
+            f"prazo padrão {default_timeout}s)."
+        )
+
+    async def submit(
+        self, user_id: int, factory: Callable[[], Awaitable[T]], timeout: Optional[float] = None, background: bool = False
+    ) -> T:
+        """
+        Enfileira `factory` (função que cria a corrotina) e aguarda o resultado.
+
+        Com `background=True` o trabalho entra na fila de prioridade baixa.
+
+        Raises:
+            QueueFullError: se a fila estiver cheia.
+            DeadlineExceededError: se o prazo vencer antes da conclusão.
+        """
+        self._stats["submitted"] += 1
+        queued = len(self._background) if background else self._queued
+        if queued >= self._max_queue_size:
+            self._stats["rejected_queue_full"] += 1
+            logger.warning(f"Fila do LLM cheia ({queued}); requisição de user_id {user_id} recusada.")
+            raise QueueFullError("Fila do LLM cheia")
+
+        timeout = self._default_timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        job = _Job(user_id, factory, loop.create_future(), time.monotonic() + timeout, background)
+
+        if background:
+            self._background.append(job)
+        else:
+            user_queue = self._queues.get(user_id)
+            if user_queue is None:
+                user_queue = self._queues[user_id] = deque()
+            user_queue.append(job)
+            self._queued += 1
+            if self._queued > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = self._queued
+
+        self._dispatch()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError:
+            self._stats["expired"] += 1
+            self._abandon(job)
+            raise DeadlineExceededError(f"Prazo de {timeout}s esgotado") from None
+        except asyncio.CancelledError:
+            # O chamador desistiu: a chamada não pode continuar ocupando uma vaga
+            self._stats["cancelled"] += 1
+            self._abandon(job)
+            raise
+
+    def get_stats(self) -> Dict[str, float]:
+        """Retorna profundidade da fila, chamadas em execução e tempos de espera."""
+        stats: Dict[str, float] = dict(self._stats)
+        started = self._stats["completed"] + self._stats["failed"]
+        stats["queue_depth"] = self._queued
+        stats["queued_users"] = len(self._queues)
+        stats["in_flight"] = self._in_flight
+        stats["background_queue_depth"] = len(self._background)
+        stats["background_in_flight"] = self._background_in_flight
+        stats["wait_time_avg"] = self._stats["wait_time_total"] / started if started else 0.0
+        return stats
+
+    # --- Despacho ---
+
+    def _abandon(self, job: _Job) -> None:
+        """Cancela o job: se ainda está na fila sai dela; se já roda, é interrompido."""
+        job.future.cancel()
+        if job.background:
+            if job in self._background:
+                self._background.remove(job)
+            return
+        user_queue = self._queues.get(job.user_id)
+        if user_queue is not None and job in user_queue:
+            user_queue.remove(job)
+            self._queued -= 1
+            if not user_queue:
+                del self._queues[job.user_id]
+
+    def _dispatch(self) -> None:
+        """Inicia jobs enquanto houver vaga, alternando entre os usuários."""
+        now = time.monotonic()
+        while self._in_flight < self._max_in_flight:
+            if self._queues:
+                user_id, user_queue = self._queues.popitem(last=False)
+                job = user_queue.popleft()
+                self._queued -= 1
+                if user_queue:
+                    # O usuário volta para o fim da fila de vez
+                    self._queues[user_id] = user_queue
+            elif self._background and self._background_in_flight < self._max_background_in_flight:
+                # Segundo plano só quando nenhum usuário está esperando
+                job = self._background.popleft()
+            else:
+                break
+
+            if job.future.done():
+                # Cancelado enquanto esperava (prazo do chamador esgotado)
+                continue
+            if job.deadline <= now:
+                job.future.set_exception(DeadlineExceededError("Prazo esgotado na fila"))
+                continue
+
+            wait_time = now - job.enqueued_at
+            self._stats["wait_time_total"] += wait_time
+            if wait_time > self._stats["wait_time_max"]:
+                self._stats["wait_time_max"] = wait_time
+
+            self._in_flight += 1
+            if job.background:
+                self._background_in_flight += 1
+            job.context.run(asyncio.ensure_future, self._run(job))
+
+    async def _run(self, job: _Job) -> None:
+        try:
+            task = asyncio.ensure_future(job.factory())
+            # Se o chamador desistir, o cancelamento do future interrompe a chamada
+            job.future.add_done_callback(lambda f: task.cancel() if f.cancelled() else None)
+            result = await task
+        except asyncio.CancelledError:
+            self._stats["failed"] += 1
+        except Exception as e:
+            self._stats["failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self._stats["completed"] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            if job.background:
+                self._background_in_flight -= 1
+            self._dispatch()
@@ -1,28 +1,111 @@
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Optional
+
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ApplicationBuilder
 
 from config import settings
 from config.settings import logger
 from . import handlers # Importa os handlers definidos
+from .offline_request import OfflineRequest
+from .per_user_update_processor import PerUserUpdateProcessor
+from .send_rate_limiter import SendRateLimiter
+from infrastructure.observability.metrics import metrics
+from infrastructure.observability.startup_report import StartupReport
 
 # Importa as dependências que os handlers precisam
 from domain.use_cases.process_user_message import ProcessUserMessageUseCase
 from domain.gateways.chatbot_gateway import ChatbotGateway
 from domain.gateways.memory_gateway import MemoryGateway
+from domain.gateways.knowledge_base_gateway import KnowledgeBaseGateway
+
+if TYPE_CHECKING:
+    from infrastructure.observability.metrics_server import MetricsServer # aiohttp só é importado se as métricas estiverem ativas
+    from infrastructure.chatbot.history_compactor import HistoryCompactor
 
 def setup_application(
     process_message_use_case: ProcessUserMessageUseCase,
-    memory_gateway: MemoryGateway # Passa a memory gateway tbm, para o /start
+    memory_gateway: MemoryGateway, # Passa a memory gateway tbm, para o /start
+    knowledge_base: Optional[KnowledgeBaseGateway] = None,
+    history_compactor: Optional["HistoryCompactor"] = None,
+    offline: bool = False,
+    metrics_server: Optional["MetricsServer"] = None,
+    token: Optional[str] = None,
+    startup_report: Optional[StartupReport] = None
 ) -> Application:
-    """Configura e retorna a aplicação do bot Telegram com handlers."""
+    """
+    Configura e retorna a aplicação do bot Telegram com handlers.
+
+    Com `offline=True` as chamadas à Bot API são respondidas localmente
+    (OfflineRequest), sem acessar o Telegram — útil para replay e testes de carga;
+    nesse modo o `token` pode ficar vazio. Com `startup_report`, o tempo de
+    inicialização de cada componente é medido e o relatório sai no log.
+    """
     logger.info("Configurando a aplicação do bot Telegram...")
+    if not token:
+        if not offline:
+            raise ValueError("TELEGRAM_BOT_TOKEN não definido")
+        token = settings.OFFLINE_BOT_TOKEN
+
+    def measure(component: str):
+        return startup_report.measure(component, "start") if startup_report is not None else nullcontext()
+
+    async def on_startup(application: Application) -> None:
+        with measure("memory"):
+            await memory_gateway.start()
+        if knowledge_base is not None:
+            with measure("knowledge_base"):
+                await knowledge_base.start()
+        if metrics_server is not None:
+            with measure("metrics_server"):
+                await metrics_server.start()
+        if startup_report is not None:
+            startup_report.finish()
+
+    async def on_shutdown(application: Application) -> None:
+        if metrics_server is not None:
+            await metrics_server.stop()
+        if history_compactor is not None:
+            # Resumos em segundo plano não podem sobreviver ao event loop
+            await history_compactor.close()
+        if knowledge_base is not None:
+            await knowledge_base.close()
+        # Garante que gravações pendentes da memória não se percam
+        await memory_gateway.close()
 
-    application = ApplicationBuilder().token(settings.TELEGRAM_BOT_TOKEN).build()
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        # Usuários diferentes em paralelo; mensagens do mesmo usuário em ordem
+        .concurrent_updates(PerUserUpdateProcessor(max_concurrent_updates=settings.MAX_CONCURRENT_UPDATES))
+    )
+    if offline:
+        logger.warning("Modo offline: as mensagens do bot NÃO serão enviadas ao Telegram.")
+        builder = builder.request(OfflineRequest()).get_updates_request(OfflineRequest())
+    else:
+        # Fila de envio com os limites do Telegram (global e por chat) e retry em flood control
+        rate_limiter = SendRateLimiter(
+            global_rate=settings.TELEGRAM_GLOBAL_RATE,
+            chat_rate=settings.TELEGRAM_CHAT_RATE,
+            chat_burst=settings.TELEGRAM_CHAT_BURST,
+            group_rate_per_minute=settings.TELEGRAM_GROUP_RATE_PER_MINUTE,
+            max_retries=settings.TELEGRAM_MAX_RETRIES,
+            low_priority_reserve=settings.TELEGRAM_LOW_PRIORITY_RESERVE,
+            chat_action_interval=settings.CHAT_ACTION_COALESCE_SECONDS
+        )
+        builder = builder.rate_limiter(rate_limiter)
+        metrics.register_collector("telegram_sends", rate_limiter.get_stats)
+    application = builder.build()
+    # Usuários ativos e filas por usuário
+    metrics.register_collector("updates", application.update_processor.get_stats)
 
     # --- Injeção de Dependência ---
     # Armazena as instâncias necessárias no contexto da aplicação
     # para que os handlers possam acessá-las via context.application.bot_data
     application.bot_data['process_message_use_case'] = process_message_use_case
     application.bot_data['memory_gateway'] = memory_gateway
+    application.bot_data['history_compactor'] = history_compactor
     logger.info("Instâncias de UseCase e Gateway injetadas no contexto do bot.")
 
     # --- Registro de Handlers ---
@@ -1,11 +1,19 @@
+import asyncio
+import time
+from typing import Optional
+
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter
 
 from domain.use_cases.process_user_message import ProcessUserMessageUseCase
 from domain.gateways.memory_gateway import MemoryGateway # Para limpar histórico
+from domain.gateways.chatbot_gateway import StreamInterruptedError
+from infrastructure.observability.metrics import metrics
+from infrastructure.telegram.send_rate_limiter import PRIORITY_LOW
 from config import settings
-from config.settings import logger
+from config.settings import logger, message_logger
 
 # --- Variáveis Globais (ou passadas via context.application.bot_data) ---
 # É crucial instanciar essas dependências uma vez e passá-las para os handlers.
@@ -28,6 +36,14 @@ async def is_user_allowed(update: Update) -> bool:
     return update.effective_user.id in settings.ALLOWED_USER_IDS
 
 
+def _rate_limit_args(context: ContextTypes.DEFAULT_TYPE, **args) -> Optional[dict]:
+    """
+    Opções para o SendRateLimiter. Sem limitador (modo offline) o PTB
+    recusa `rate_limit_args`, então nada é passado.
+    """
+    return args if context.bot.rate_limiter is not None else None
+
+
 # --- Handlers ---
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -44,13 +60,22 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     # Limpa o histórico do usuário ao iniciar (opcional, mas bom para recomeçar)
     memory_gateway: MemoryGateway = context.application.bot_data['memory_gateway']
     await memory_gateway.clear_history(user_id)
+    # O resumo da conversa antiga também não pode voltar ao prompt
+    history_compactor = context.application.bot_data.get('history_compactor')
+    if history_compactor is not None:
+        history_compactor.forget(user_id)
 
-    # Mensagem inicial
+    # Mensagem inicial (saudação e ajuda em uma mensagem só: metade dos envios)
     initial_greeting = f"Olá, {user.first_name}! Sou o assistente dos fãs de CS da FURIA 🐾"
     initial_help = "Como posso te ajudar? Você pode digitar sua pergunta ou usar os botões abaixo!"
 
-    await update.message.reply_text(initial_greeting)
-    await update.message.reply_text(initial_help, reply_markup=SUGGESTION_MARKUP)
+    # Baixa prioridade: em picos, as respostas às perguntas passam na frente
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text=f"{initial_greeting}\n\n{initial_help}",
+        reply_markup=SUGGESTION_MARKUP,
+        rate_limit_args=_rate_limit_args(context, priority=PRIORITY_LOW)
+    )
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -80,7 +105,10 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """Handler para mensagens de texto normais."""
     user_id = update.effective_user.id
     message_text = update.message.text
-    logger.info(f"Mensagem recebida de user_id {user_id}: '{message_text}'")
+    if metrics.trace_logging:
+        metrics.new_trace_id()
+    message_logger.info("Mensagem recebida de user_id %s: '%s'", user_id, message_text)
+    metrics.inc("messages_received_total", help_text="Mensagens de texto recebidas")
 
     if not await is_user_allowed(update):
         logger.warning(f"Usuário {user_id} não autorizado enviou mensagem.")
@@ -91,21 +119,105 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Recupera o use case injetado durante a configuração
     process_message_use_case: ProcessUserMessageUseCase = context.application.bot_data['process_message_use_case']
 
+    started = time.perf_counter()
     try:
         # Envia ação "digitando..." para o usuário
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
-
-        # Executa o caso de uso para obter a resposta
-        bot_response = await process_message_use_case.execute(user_id, message_text)
-
-        # Envia a resposta de volta ao usuário
-        # Usamos parse_mode=ParseMode.HTML ou MARKDOWN se quisermos formatar
-        await update.message.reply_text(bot_response, reply_markup=SUGGESTION_MARKUP)
-        logger.info(f"Resposta enviada para user_id {user_id}.")
+        with metrics.span("chat_action"):
+            await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
+
+        if settings.STREAMING_ENABLED:
+            # Envia a resposta aos poucos, editando a mesma mensagem
+            await _reply_streaming(update, context, process_message_use_case, user_id, message_text)
+        else:
+            # Executa o caso de uso para obter a resposta
+            bot_response = await process_message_use_case.execute(user_id, message_text)
+
+            # Envia a resposta de volta ao usuário
+            # Usamos parse_mode=ParseMode.HTML ou MARKDOWN se quisermos formatar
+            with metrics.span("reply_send"):
+                await update.message.reply_text(bot_response, reply_markup=SUGGESTION_MARKUP)
+        message_logger.info("Resposta enviada para user_id %s.", user_id)
 
     except Exception as e:
         logger.error(f"Erro ao processar mensagem de user_id {user_id}: {e}", exc_info=True)
-        await update.message.reply_text("Ocorreu um erro inesperado ao processar sua solicitação. Por favor, tente novamente.")
+        metrics.inc("message_errors_total", help_text="Mensagens que terminaram em erro no handler")
+        await update.message.reply_text(settings.UNEXPECTED_ERROR_MESSAGE)
+    finally:
+        metrics.observe("message_seconds", time.perf_counter() - started, "Tempo total de processamento de uma mensagem")
+
+
+async def _reply_streaming(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    process_message_use_case: ProcessUserMessageUseCase,
+    user_id: int,
+    message_text: str
+) -> None:
+    """
+    Envia a resposta em streaming: manda a primeira mensagem assim que há
+    texto suficiente e depois a edita progressivamente, no máximo uma vez
+    a cada STREAM_EDIT_INTERVAL_SECONDS (o Telegram limita edições).
+    """
+    chat_id = update.effective_chat.id
+    sent_message = None
+    sent_text = ""
+    text = ""
+    next_edit_at = 0.0
+
+    try:
+        async for chunk in process_message_use_case.execute_stream(user_id, message_text):
+            text += chunk
+            if not text.strip():
+                continue
+
+            if sent_message is None:
+                if len(text) < settings.STREAM_MIN_FIRST_CHARS:
+                    continue
+                with metrics.span("reply_send"):
+                    sent_message = await update.message.reply_text(text, reply_markup=SUGGESTION_MARKUP)
+                sent_text = text
+                next_edit_at = time.monotonic() + settings.STREAM_EDIT_INTERVAL_SECONDS
+            elif time.monotonic() >= next_edit_at and text != sent_text:
+                next_edit_at = await _edit_streamed_message(context, chat_id, sent_message.message_id, text)
+                sent_text = text
+    except StreamInterruptedError as e:
+        # O usuário fica com o texto parcial, avisado de que ele está incompleto
+        logger.warning(f"Streaming interrompido para user_id {user_id}: {e}")
+        metrics.inc("stream_interrupted_total", help_text="Respostas em streaming interrompidas no meio")
+        text += settings.LLM_STREAM_INTERRUPTED_MESSAGE
+
+    # Mensagem final: resposta curta (nunca enviada) ou última edição pendente
+    if sent_message is None:
+        with metrics.span("reply_send"):
+            await update.message.reply_text(text or settings.LLM_ERROR_MESSAGE, reply_markup=SUGGESTION_MARKUP)
+    elif text != sent_text:
+        await _edit_streamed_message(context, chat_id, sent_message.message_id, text, final=True)
+
+
+async def _edit_streamed_message(
+    context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: int, text: str, final: bool = False
+) -> float:
+    """Edita a mensagem em streaming e retorna o horário (monotonic) da próxima edição permitida."""
+    # Edições intermediárias são descartáveis: baixa prioridade e sem retry
+    # (a próxima edição leva o texto atualizado); a final usa o retry do limitador
+    rate_limit_args = None if final else _rate_limit_args(context, priority=PRIORITY_LOW, max_retries=0)
+    try:
+        with metrics.span("reply_edit"):
+            await context.bot.edit_message_text(
+                text, chat_id=chat_id, message_id=message_id, rate_limit_args=rate_limit_args
+            )
+    except RetryAfter as e:
+        retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+        logger.warning(f"Limite de edição atingido no chat {chat_id}; aguardando {retry_after}s.")
+        if not final:
+            return time.monotonic() + retry_after
+        # A última edição precisa chegar, então espera e tenta de novo
+        await asyncio.sleep(retry_after)
+        await context.bot.edit_message_text(text, chat_id=chat_id, message_id=message_id)
+    except BadRequest as e:
+        # "Message is not modified" e similares não são fatais durante o streaming
+        message_logger.debug("Edição ignorada no chat %s: %s", chat_id, e)
+    return time.monotonic() + settings.STREAM_EDIT_INTERVAL_SECONDS
 
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -113,4 +225,4 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
     logger.error(f"Exceção ao processar um update: {context.error}", exc_info=context.error)
     # Opcional: Informar o usuário que algo deu errado
     if isinstance(update, Update):
-        await update.message.reply_text("Desculpe, ocorreu um erro interno. A equipe foi notificada.")
\ No newline at end of file
+        await update.message.reply_text(settings.INTERNAL_ERROR_MESSAGE)
\ No newline at end of file
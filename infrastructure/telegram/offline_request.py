@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+from config.settings import logger
+
+# Usuário "bot" devolvido pelo getMe no modo offline
+_OFFLINE_BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Furia Offline",
+    "username": "furia_offline_bot",
+    "can_join_groups": False,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": False,
+}
+
+# Métodos da API que devolvem uma Message
+_MESSAGE_METHODS = {"sendMessage", "editMessageText"}
+
+
+class OfflineRequest(BaseRequest):
+    """
+    Substituto do cliente HTTP do python-telegram-bot que nunca acessa o Telegram.
+
+    Responde cada chamada da Bot API com um resultado falso plausível
+    (getMe, sendMessage, editMessageText, ...) e registra as chamadas
+    feitas, para testes de carga e replay de updates capturados.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, max_recorded_calls: int = 10000):
+        self._latency_seconds = latency_seconds
+        self._next_message_id = 1
+        # Últimas chamadas: (método, parâmetros, horário)
+        self.calls: Deque[Tuple[str, Dict[str, Any], float]] = deque(maxlen=max_recorded_calls)
+        self.call_counts: Counter = Counter()
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        logger.info("Cliente offline do Telegram ativo: nenhuma chamada sairá para a rede.")
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout: Any = BaseRequest.DEFAULT_NONE,
+        write_timeout: Any = BaseRequest.DEFAULT_NONE,
+        connect_timeout: Any = BaseRequest.DEFAULT_NONE,
+        pool_timeout: Any = BaseRequest.DEFAULT_NONE,
+    ) -> Tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        parameters = dict(request_data.parameters) if request_data is not None else {}
+        self.calls.append((api_method, parameters, time.monotonic()))
+        self.call_counts[api_method] += 1
+
+        if api_method == "getUpdates":
+            # Simula o long polling sem updates, para não girar em falso
+            await asyncio.sleep(1.0)
+        elif self._latency_seconds > 0:
+            await asyncio.sleep(self._latency_seconds)
+
+        payload = {"ok": True, "result": self._fake_result(api_method, parameters)}
+        return 200, json.dumps(payload).encode("utf-8")
+
+    def _fake_result(self, api_method: str, parameters: Dict[str, Any]) -> Any:
+        if api_method == "getMe":
+            return _OFFLINE_BOT_USER
+        if api_method in _MESSAGE_METHODS:
+            message_id = parameters.get("message_id")
+            if message_id is None:
+                message_id = self._next_message_id
+                self._next_message_id += 1
+            return {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": parameters.get("chat_id", 0), "type": "private"},
+                "from": _OFFLINE_BOT_USER,
+                "text": parameters.get("text", ""),
+            }
+        if api_method == "getUpdates":
+            return []
+        # sendChatAction, setWebhook, deleteWebhook, ...
+        return True
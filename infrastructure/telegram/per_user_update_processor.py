@@ -0,0 +1,97 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from config.settings import logger
+
+
+class _UserSlot:
+    """Lock de um usuário e quantos updates dele estão na fila ou em execução."""
+
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processa updates de usuários diferentes em paralelo, mas os de um
+    mesmo usuário um de cada vez, na ordem de chegada.
+
+    Assim duas mensagens rápidas do mesmo usuário não disputam o
+    get_history/add_interaction da memória. O lock de cada usuário é
+    criado sob demanda e descartado assim que ele não tem mais updates
+    pendentes.
+    """
+
+    def __init__(self, max_concurrent_updates: int = 256):
+        super().__init__(max_concurrent_updates=max_concurrent_updates)
+        self._slots: Dict[int, _UserSlot] = {}
+        self._processed = 0
+        self._max_user_queue = 0
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Espera a vez do usuário ANTES de ocupar uma vaga de concorrência:
+        se a ordem fosse invertida, um usuário com muitas mensagens
+        seguraria todas as vagas enquanto espera o próprio lock.
+        """
+        key = self._user_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _UserSlot()
+        slot.pending += 1
+        if slot.pending > self._max_user_queue:
+            self._max_user_queue = slot.pending
+        try:
+            async with slot.lock:
+                await super().process_update(update, coroutine)
+        finally:
+            slot.pending -= 1
+            if slot.pending == 0 and self._slots.get(key) is slot:
+                # Usuário ocioso: descarta o lock
+                del self._slots[key]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        self._processed += 1
+        await coroutine
+
+    async def initialize(self) -> None:
+        logger.info(f"Processamento concorrente por usuário ativo (máx. {self.max_concurrent_updates} updates simultâneos).")
+
+    async def shutdown(self) -> None:
+        pass
+
+    def queue_length(self, user_id: int) -> int:
+        """Updates do usuário na fila ou em execução."""
+        slot = self._slots.get(user_id)
+        return slot.pending if slot is not None else 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna usuários ativos e o tamanho das filas por usuário."""
+        pending = [slot.pending for slot in self._slots.values()]
+        return {
+            "active_users": len(pending),
+            "pending_updates": sum(pending),
+            "longest_user_queue": max(pending, default=0),
+            "max_user_queue_seen": self._max_user_queue,
+            "processed_updates": self._processed,
+        }
+
+    @staticmethod
+    def _user_key(update: object) -> Optional[int]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
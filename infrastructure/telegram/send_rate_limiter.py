@@ -0,0 +1,215 @@
+import asyncio
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config.settings import logger
+
+JSONDict = Dict[str, Any]
+
+# Classes de tráfego (rate_limit_args={"priority": ...})
+PRIORITY_NORMAL = "normal"
+PRIORITY_LOW = "low" # Pode esperar: edições intermediárias do streaming, saudações
+
+
+class _TokenBucket:
+    """
+    Balde de fichas com reserva: cada envio reserva uma ficha (o saldo pode
+    ficar negativo) e espera o tempo até ela existir. Assim a ordem de
+    chegada é respeitada sem locks.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def available(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def reserve(self, now: float) -> float:
+        """Consome uma ficha e retorna quantos segundos esperar por ela."""
+        self.tokens = self.available(now) - 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def is_full(self, now: float) -> bool:
+        return self.available(now) >= self.capacity
+
+
+class SendRateLimiter(BaseRateLimiter[JSONDict]):
+    """
+    Limitador das chamadas à Bot API que respeita os limites do Telegram:
+    um balde global (mensagens/s do bot) e um por chat (privado ou grupo).
+
+    - `sendChatAction` repetido para o mesmo chat dentro de
+      `chat_action_interval` é respondido localmente (o "digitando..."
+      ainda está visível), sem gastar fichas.
+    - Tráfego de baixa prioridade (rate_limit_args={"priority": "low"}) só
+      usa o balde global quando sobra folga, deixando as respostas passarem
+      na frente.
+    - RetryAfter pausa os envios ao chat pelo tempo pedido e a chamada
+      é repetida até `max_retries` vezes (rate_limit_args={"max_retries": n}
+      muda isso por chamada).
+
+    Chamadas sem chat_id (getUpdates, getMe, setWebhook...) não são limitadas.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        group_rate_per_minute: float = 20.0,
+        max_retries: int = 3,
+        low_priority_reserve: float = 0.2,
+        chat_action_interval: float = 4.5,
+        max_idle_buckets: int = 10000,
+    ):
+        self._global = _TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._group_rate = group_rate_per_minute / 60
+        self._max_retries = max_retries
+        # Fichas globais mantidas livres para o tráfego normal
+        self._low_priority_reserve = global_rate * low_priority_reserve
+        self._chat_action_interval = chat_action_interval
+        self._max_idle_buckets = max_idle_buckets
+        self._chat_buckets: Dict[Union[int, str], _TokenBucket] = {}
+        self._chat_actions: Dict[Union[int, str], Dict[str, float]] = {} # chat -> {ação: enviada em}
+        self._paused_until: Dict[Union[int, str], float] = {} # chat -> fim da pausa (monotonic)
+        self._stats = {
+            "requests": 0,
+            "throttled": 0, # Precisaram esperar por fichas
+            "coalesced_chat_actions": 0,
+            "retries": 0,
+            "wait_seconds_total": 0.0,
+        }
+
+    async def initialize(self) -> None:
+        logger.info(
+            f"Limitador de envios ativo ({self._global.rate:.0f} msg/s global, "
+            f"{self._chat_rate} msg/s por chat, {self._group_rate * 60:.0f} msg/min por grupo)."
+        )
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, JSONDict, List[JSONDict]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[JSONDict],
+    ) -> Union[bool, JSONDict, List[JSONDict]]:
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            return await callback(*args, **kwargs)
+
+        self._stats["requests"] += 1
+        options = rate_limit_args or {}
+        if endpoint == "sendChatAction" and self._is_redundant_action(chat_id, data.get("action", ""), time.monotonic()):
+            self._stats["coalesced_chat_actions"] += 1
+            return True
+
+        max_retries = options.get("max_retries", self._max_retries)
+        attempt = 0
+        while True:
+            await self._acquire(chat_id, options.get("priority", PRIORITY_NORMAL), endpoint != "sendChatAction")
+            try:
+                result = await callback(*args, **kwargs)
+                if endpoint != "sendChatAction":
+                    # Uma mensagem enviada encerra o "digitando..." no app do usuário
+                    self._chat_actions.pop(chat_id, None)
+                return result
+            except RetryAfter as e:
+                # A pausa vale para o chat inteiro, mesmo quando este envio não será repetido
+                # (ex.: edições intermediárias do streaming): os próximos envios precisam esperar
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else float(e.retry_after)
+                self._paused_until[chat_id] = max(self._paused_until.get(chat_id, 0.0), time.monotonic() + retry_after)
+                if attempt >= max_retries:
+                    raise
+                attempt += 1
+                self._stats["retries"] += 1
+                logger.warning(f"Flood control do Telegram no chat {chat_id}: pausando {retry_after}s (tentativa {attempt}).")
+
+    def get_stats(self) -> Dict[str, float]:
+        stats: Dict[str, float] = dict(self._stats)
+        stats["chat_buckets"] = len(self._chat_buckets)
+        stats["paused_chats"] = sum(1 for until in self._paused_until.values() if until > time.monotonic())
+        return stats
+
+    def _is_redundant_action(self, chat_id: Union[int, str], action: str, now: float) -> bool:
+        actions = self._chat_actions.get(chat_id)
+        if actions is None:
+            if len(self._chat_actions) >= self._max_idle_buckets:
+                # Descarta os chats cujas ações já expiraram
+                self._chat_actions = {
+                    chat: sent for chat, sent in self._chat_actions.items()
+                    if any(now - t < self._chat_action_interval for t in sent.values())
+                }
+            actions = self._chat_actions[chat_id] = {}
+        sent_at = actions.get(str(action))
+        if sent_at is not None and now - sent_at < self._chat_action_interval:
+            return True
+        actions[str(action)] = now
+        return False
+
+    async def _acquire(self, chat_id: Union[int, str], priority: str, per_chat: bool = True) -> None:
+        waited = 0.0
+
+        # 1. Pausa imposta por um RetryAfter
+        paused = self._paused_until.get(chat_id, 0.0) - time.monotonic()
+        if paused > 0:
+            await asyncio.sleep(paused)
+            waited += paused
+
+        # 2. Limite do chat (o "digitando..." não atrasa a resposta que vem logo depois)
+        if per_chat:
+            delay = self._chat_bucket(chat_id).reserve(time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+                waited += delay
+
+        # 3. Limite global; tráfego de baixa prioridade espera haver folga
+        if priority == PRIORITY_LOW:
+            while True:
+                missing = self._low_priority_reserve + 1 - self._global.available(time.monotonic())
+                if missing <= 0:
+                    break
+                delay = missing / self._global.rate
+                await asyncio.sleep(delay)
+                waited += delay
+        delay = self._global.reserve(time.monotonic())
+        if delay > 0:
+            await asyncio.sleep(delay)
+            waited += delay
+
+        if waited > 0:
+            self._stats["throttled"] += 1
+            self._stats["wait_seconds_total"] += waited
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> _TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self._max_idle_buckets:
+                self._drop_idle_buckets()
+            # Grupos/canais (id negativo ou @username) têm limite por minuto
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = _TokenBucket(self._group_rate, self._group_rate * 60) if is_group else _TokenBucket(self._chat_rate, self._chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _drop_idle_buckets(self) -> None:
+        """Remove os baldes cheios (chats sem envios recentes) e pausas vencidas."""
+        now = time.monotonic()
+        self._chat_buckets = {chat: bucket for chat, bucket in self._chat_buckets.items() if not bucket.is_full(now)}
+        self._paused_until = {chat: until for chat, until in self._paused_until.items() if until > now}
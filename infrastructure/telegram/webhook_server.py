@@ -0,0 +1,140 @@
+import asyncio
+import hmac
+import signal
+from json import JSONDecodeError
+from typing import Optional
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from config.settings import logger
+
+# Cabeçalho enviado pelo Telegram com o secret_token configurado no setWebhook
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """
+    Servidor HTTP assíncrono (aiohttp) que recebe os updates do Telegram.
+
+    - POST `url_path`: valida o secret token e coloca o update na fila da Application.
+    - GET `health_path`: verificação de saúde para o load balancer.
+
+    O servidor não guarda estado: várias instâncias podem rodar atrás de
+    um load balancer, desde que a memória da conversa seja compartilhada
+    (ex.: MEMORY_BACKEND=sqlite em um volume comum).
+    """
+
+    def __init__(
+        self,
+        application: Application,
+        listen: str = "0.0.0.0",
+        port: int = 8443,
+        url_path: str = "/telegram",
+        secret_token: Optional[str] = None,
+        health_path: str = "/healthz",
+    ):
+        self._application = application
+        self._listen = listen
+        self._port = port
+        self._secret_token = secret_token
+        self._runner: Optional[web.AppRunner] = None
+        self._received = 0
+        self._rejected = 0
+
+        self.web_app = web.Application()
+        self.web_app.router.add_post(url_path, self._handle_update)
+        self.web_app.router.add_get(health_path, self._handle_health)
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.web_app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._listen, self._port)
+        await site.start()
+        logger.info(f"Servidor webhook ouvindo em {self._listen}:{self._port}.")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("Servidor webhook encerrado.")
+
+    async def _handle_update(self, request: web.Request) -> web.Response:
+        if self._secret_token is not None:
+            received_token = request.headers.get(SECRET_TOKEN_HEADER, "")
+            if not hmac.compare_digest(received_token, self._secret_token):
+                self._rejected += 1
+                logger.warning(f"Update recusado: secret token inválido (origem {request.remote}).")
+                return web.Response(status=403)
+
+        try:
+            data = await request.json()
+            if not isinstance(data, dict):
+                # JSON válido, mas não é um objeto (ex.: `5` ou uma lista)
+                raise ValueError(f"esperado um objeto JSON, recebido {type(data).__name__}")
+            update = Update.de_json(data, self._application.bot)
+        except (JSONDecodeError, ValueError, TypeError, KeyError) as e:
+            self._rejected += 1
+            logger.warning(f"Update inválido recebido no webhook: {e}")
+            return web.Response(status=400)
+
+        self._received += 1
+        # Responde logo; o processamento segue em segundo plano na Application
+        await self._application.update_queue.put(update)
+        return web.Response(status=200)
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        health = {
+            "status": "ok" if self._application.running else "starting",
+            "received_updates": self._received,
+            "rejected_updates": self._rejected,
+            "pending_updates": self._application.update_queue.qsize(),
+        }
+        update_processor = self._application.update_processor
+        if hasattr(update_processor, "get_stats"):
+            # Updates já retirados da fila mas ainda aguardando/em processamento
+            health["processing"] = update_processor.get_stats()
+        return web.json_response(health)
+
+
+async def run_webhook(
+    application: Application,
+    server: WebhookServer,
+    webhook_url: Optional[str] = None,
+    secret_token: Optional[str] = None,
+) -> None:
+    """
+    Inicia a Application e o servidor webhook e roda até receber SIGINT/SIGTERM.
+
+    Se `webhook_url` for informado, registra o webhook no Telegram
+    (em um cluster, apenas uma instância precisa fazer isso).
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError: # Windows
+            pass
+
+    async with application:
+        # post_init/post_shutdown só são chamados automaticamente por run_polling/run_webhook
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await server.start()
+        try:
+            if webhook_url:
+                await application.bot.set_webhook(
+                    url=webhook_url,
+                    secret_token=secret_token,
+                    allowed_updates=Update.ALL_TYPES
+                )
+                logger.info(f"Webhook registrado no Telegram: {webhook_url}")
+            await stop_event.wait()
+        finally:
+            await server.stop()
+            await application.stop()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
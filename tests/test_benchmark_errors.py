@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("telegram")
+pytest.importorskip("langchain")
+
+from benchmarks.message_pipeline import _is_error_reply, compare_with_baseline
+from config import settings
+
+
+@pytest.mark.parametrize("method, text", [
+    ("sendMessage", settings.LLM_ERROR_MESSAGE),
+    ("sendMessage", settings.LLM_BUSY_MESSAGE),
+    ("sendMessage", settings.UNEXPECTED_ERROR_MESSAGE),
+    ("sendMessage", settings.INTERNAL_ERROR_MESSAGE),
+    ("editMessageText", "FURIA 🐾 resposta" + settings.LLM_STREAM_INTERRUPTED_MESSAGE),
+])
+def test_error_replies_are_counted(method, text):
+    assert _is_error_reply(method, {"text": text})
+
+
+@pytest.mark.parametrize("method, text", [
+    ("sendMessage", "FURIA 🐾 resposta"),
+    ("sendChatAction", None),
+])
+def test_other_calls_are_not_errors(method, text):
+    assert not _is_error_reply(method, {"text": text})
+
+
+def _result(messages=100, error_replies=0, p95_ms=100.0, messages_per_s=10.0):
+    return {"messages": messages, "error_replies": error_replies, "p95_ms": p95_ms, "messages_per_s": messages_per_s}
+
+
+def test_more_rejections_are_a_regression_even_if_faster():
+    baseline = {"u1000_h0": _result(error_replies=10)}
+    results = {"u1000_h0": _result(error_replies=40, p95_ms=50.0, messages_per_s=30.0)}
+    compared, regressions, _ = compare_with_baseline(results, baseline, 0.2)
+    assert compared == ["u1000_h0"]
+    assert len(regressions) == 1 and "erro" in regressions[0]
+
+
+def test_fewer_rejections_are_not_a_latency_regression():
+    baseline = {"u1000_h0": _result(error_replies=40, p95_ms=50.0, messages_per_s=30.0)}
+    results = {"u1000_h0": _result(error_replies=0, p95_ms=200.0, messages_per_s=10.0)}
+    _, regressions, notes = compare_with_baseline(results, baseline, 0.2)
+    assert regressions == []
+    assert len(notes) == 1
+
+
+def test_nothing_compared_when_no_scenario_matches():
+    compared, regressions, _ = compare_with_baseline({"u5_h0": _result()}, {"u10_h0": _result()}, 0.2)
+    assert compared == [] and regressions == []
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from domain.gateways.chatbot_gateway import ChatbotGateway
+from infrastructure.chatbot.cached_chatbot import CachedChatbot
+
+
+class EchoChatbot(ChatbotGateway):
+    """Responde com a própria pergunta (e o primeiro trecho de contexto, se houver)."""
+
+    async def generate_response(self, user_id, user_input, history, context=None):
+        return f"resposta: {user_input}" + (f" [{context[0]}]" if context else "")
+
+
+def _ask_twice(first: str, second: str, first_context=None, second_context=None) -> str:
+    async def run() -> str:
+        cache = CachedChatbot(EchoChatbot())
+        await cache.generate_response(1, first, [], first_context)
+        return await cache.generate_response(2, second, [], second_context)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("first, second", [
+    ("quem ganhou o jogo de ontem", "quem ganhou o jogo de hoje"),
+    ("qual o placar contra a navi", "qual o placar contra a vitality"),
+    ("quem ganhou o major de 2022", "quem ganhou o major de 2023"),
+])
+def test_similar_question_with_different_entity_is_a_miss(first, second):
+    assert _ask_twice(first, second) == f"resposta: {second}"
+
+
+@pytest.mark.parametrize("first, second", [
+    ("quem é o capitão da furia?", "quem e o capitao da furia"),
+    ("qual o mapa favorito da furia", "qual o mapa favorito da furiaa"),
+])
+def test_near_duplicate_question_is_a_hit(first, second):
+    assert _ask_twice(first, second) == f"resposta: {first}"
+
+
+def test_knowledge_context_is_part_of_the_key():
+    question = "quem é o técnico da furia"
+    assert _ask_twice(question, question, ["fato antigo"], ["fato novo"]) == f"resposta: {question} [fato novo]"
+    assert _ask_twice(question, "quem e o tecnico da furia", ["fato"], ["fato"]) == f"resposta: {question} [fato]"
+
+
+
+class HistoryEchoChatbot(ChatbotGateway):
+    """Responde citando a última pergunta do histórico (o assunto de "dele")."""
+
+    async def generate_response(self, user_id, user_input, history, context=None):
+        return f"resposta: {user_input} ({history[-1][0] if history else 'sem histórico'})"
+
+
+def test_follow_up_question_depends_on_history():
+    async def run():
+        cache = CachedChatbot(HistoryEchoChatbot())
+        yuurih = [("quem é o yuurih?", "o yuurih é um jogador da furia")]
+        fallen = [("quem é o fallen?", "o fallen é um jogador brasileiro")]
+        await cache.generate_response(1, "qual o nome completo dele?", yuurih)
+        other_user = await cache.generate_response(2, "qual o nome completo dele?", fallen)
+        same_conversation = await cache.generate_response(3, "qual o nome completo dele?", list(yuurih))
+        return other_user, same_conversation, cache.get_stats()
+
+    other_user, same_conversation, stats = asyncio.run(run())
+    assert other_user == "resposta: qual o nome completo dele? (quem é o fallen?)"
+    assert same_conversation == "resposta: qual o nome completo dele? (quem é o yuurih?)"
+    assert stats["exact_hits"] == 1
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from benchmarks.fake_llm import FakeMessage
+from infrastructure.chatbot.history_compactor import HistoryCompactor
+from infrastructure.chatbot.langchain_chatbot import LangchainChatbot
+from infrastructure.chatbot.scheduled_chatbot import ScheduledChatbot
+from infrastructure.scheduler.llm_scheduler import LLMScheduler
+
+HISTORY = [(f"pergunta {i} " * 20, f"resposta {i} " * 20) for i in range(6)]
+
+
+class SlowSummaryLLM:
+    """Responde na hora; o resumo demora até `release` ser liberado."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.summary_calls = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        if "Novas interações" in messages[-1].content:
+            self.summary_calls += 1
+            await self.release.wait()
+            return FakeMessage("resumo novo")
+        return FakeMessage("resposta")
+
+
+def build(llm):
+    compactor = HistoryCompactor(max_history_tokens=100, summary_min_turns=2)
+    chatbot = LangchainChatbot(llm=llm, history_compactor=compactor)
+    scheduler = LLMScheduler(max_in_flight=2, max_queue_size=10, default_timeout=5)
+    compactor.summarizer = ScheduledChatbot(inner=chatbot, scheduler=scheduler).summarize_history
+    return compactor, chatbot, scheduler
+
+
+def test_summary_goes_through_scheduler_at_low_priority():
+    async def run():
+        llm = SlowSummaryLLM()
+        compactor, chatbot, scheduler = build(llm)
+        await chatbot.generate_response(1, "oi", HISTORY)
+        await asyncio.sleep(0.01)
+        during = scheduler.get_stats()
+        llm.release.set()
+        await asyncio.sleep(0.01)
+        summary, _ = compactor.compact(1, HISTORY)
+        return llm.summary_calls, during, summary
+
+    summary_calls, during, summary = asyncio.run(run())
+    assert summary_calls == 1
+    assert during["background_in_flight"] == 1
+    assert summary == "resumo novo"
+
+
+def test_close_cancels_pending_summaries():
+    async def run():
+        llm = SlowSummaryLLM()
+        compactor, chatbot, scheduler = build(llm)
+        await chatbot.generate_response(1, "oi", HISTORY)
+        await asyncio.sleep(0.01)
+        await compactor.close()
+        await asyncio.sleep(0)
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0
+    assert stats["background_in_flight"] == 0
+
+
+def _summarized_compactor():
+    async def run():
+        llm = SlowSummaryLLM()
+        llm.release.set()
+        compactor, chatbot, _ = build(llm)
+        await chatbot.generate_response(1, "oi", HISTORY)
+        await asyncio.sleep(0.01)
+        assert compactor.compact(1, HISTORY)[0] == "resumo novo"
+        return compactor
+
+    return asyncio.run(run())
+
+
+def test_forget_drops_the_summary():
+    compactor = _summarized_compactor()
+    compactor.forget(1)
+    summary, _ = compactor.compact(1, [("Próximos jogos", "agenda da furia")])
+    assert summary == ""
+
+
+def test_shorter_history_means_it_was_cleared():
+    # Ex.: /start em outra instância ou usuário removido da memória por ociosidade
+    compactor = _summarized_compactor()
+    summary, _ = compactor.compact(1, [("Próximos jogos", "agenda da furia")])
+    assert summary == ""
@@ -0,0 +1,42 @@
+import pytest
+
+from config import settings
+from domain.intent_index import IntentIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    return IntentIndex.from_commands(
+        settings.PREDEFINED_COMMANDS,
+        settings.PREDEFINED_COMMAND_PARAPHRASES,
+        threshold=settings.INTENT_MATCH_THRESHOLD
+    )
+
+
+@pytest.mark.parametrize("text", [
+    "line up da mibr",
+    "próximo jogo da loud",
+    "qual o grito da torcida do corinthians",
+    "me conta uma curiosidade sobre o fallen",
+    "quem são os jogadores da navi",
+    "quando a loud joga",
+])
+def test_questions_about_other_subjects_go_to_the_llm(index, text):
+    assert index.match(text) is None
+
+
+@pytest.mark.parametrize("text, command", [
+    ("quando é o próximo jogo?", "próximos jogos"),
+    ("quando vai ser o próximo jogo", "próximos jogos"),
+    ("proxima partida da furia", "próximos jogos"),
+    ("line up da furia", "jogadores"),
+    ("elenco atual da furia", "jogadores"),
+    ("me fala uma curiosidade da furia", "curiosidades"),
+    ("curiozidades", "curiosidades"),
+    ("qual é o grito da torcida", "frases"),
+    ("frase da torcida", "frases"),
+])
+def test_paraphrases_still_match(index, text, command):
+    match = index.match(text)
+    assert match is not None
+    assert match.command == command
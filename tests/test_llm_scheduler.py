@@ -0,0 +1,146 @@
+import asyncio
+import contextvars
+
+from infrastructure.scheduler.llm_scheduler import DeadlineExceededError, LLMScheduler
+
+
+def test_cancelled_submit_does_not_run_queued_job():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue_size=10, default_timeout=5)
+        started = []
+        release = asyncio.Event()
+
+        async def job(name):
+            started.append(name)
+            await release.wait()
+            return name
+
+        first = asyncio.ensure_future(scheduler.submit(1, lambda: job("primeiro")))
+        second = asyncio.ensure_future(scheduler.submit(2, lambda: job("segundo")))
+        await asyncio.sleep(0)
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        assert scheduler.get_stats()["queue_depth"] == 0
+
+        release.set()
+        assert await first == "primeiro"
+        await asyncio.sleep(0.01)
+        return started, scheduler.get_stats()
+
+    started, stats = asyncio.run(run())
+    assert started == ["primeiro"]
+    assert stats["cancelled"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_submit_interrupts_running_job():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue_size=10, default_timeout=5)
+        interrupted = asyncio.Event()
+
+        async def job():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                interrupted.set()
+                raise
+
+        submitted = asyncio.ensure_future(scheduler.submit(1, job))
+        await asyncio.sleep(0.01)
+        submitted.cancel()
+        await asyncio.wait_for(interrupted.wait(), 1)
+        await asyncio.sleep(0)
+        return scheduler.get_stats()
+
+    assert asyncio.run(run())["in_flight"] == 0
+
+
+def test_deadline_removes_job_from_queue():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue_size=10, default_timeout=5)
+        blocker = asyncio.ensure_future(scheduler.submit(1, lambda: asyncio.sleep(0.2)))
+        try:
+            await scheduler.submit(2, lambda: asyncio.sleep(0), timeout=0.01)
+        except DeadlineExceededError:
+            pass
+        depth = scheduler.get_stats()["queue_depth"]
+        await blocker
+        return depth
+
+    assert asyncio.run(run()) == 0
+
+
+def test_abandoned_stream_releases_the_slot():
+    from domain.gateways.chatbot_gateway import ChatbotGateway
+    from infrastructure.chatbot.scheduled_chatbot import ScheduledChatbot
+
+    class SlowStream(ChatbotGateway):
+        def __init__(self):
+            self.finished = False
+
+        async def generate_response(self, user_id, user_input, history, context=None):
+            return ""
+
+        async def stream_response(self, user_id, user_input, history, context=None):
+            yield "primeiro "
+            await asyncio.sleep(10)
+            self.finished = True
+            yield "segundo"
+
+    async def run():
+        inner = SlowStream()
+        scheduler = LLMScheduler(max_in_flight=1, max_queue_size=10, default_timeout=30)
+        stream = ScheduledChatbot(inner, scheduler).stream_response(1, "oi", [])
+        assert await stream.__anext__() == "primeiro "
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+        return inner.finished, scheduler.get_stats()["in_flight"]
+
+    assert asyncio.run(run()) == (False, 0)
+
+
+def test_background_jobs_wait_for_user_requests():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue_size=10, default_timeout=5)
+        order = []
+        release = asyncio.Event()
+
+        async def job(name):
+            order.append(name)
+            await release.wait()
+            return name
+
+        first = asyncio.ensure_future(scheduler.submit(1, lambda: job("usuario1")))
+        await asyncio.sleep(0)
+        summary = asyncio.ensure_future(scheduler.submit(1, lambda: job("resumo"), background=True))
+        second = asyncio.ensure_future(scheduler.submit(2, lambda: job("usuario2")))
+        await asyncio.sleep(0)
+        assert scheduler.get_stats()["background_queue_depth"] == 1
+
+        release.set()
+        await asyncio.gather(first, second, summary)
+        return order, scheduler.get_stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["usuario1", "usuario2", "resumo"]
+    assert stats["background_in_flight"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_jobs_run_in_the_context_of_their_caller():
+    trace_id = contextvars.ContextVar("trace_id", default=None)
+
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue_size=10, default_timeout=5)
+
+        async def job():
+            await asyncio.sleep(0.01)
+            return trace_id.get()
+
+        async def caller(name):
+            trace_id.set(name)
+            return await scheduler.submit(1, job)
+
+        return await asyncio.gather(*(caller(name) for name in ("a", "b", "c")))
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
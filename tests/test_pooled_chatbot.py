@@ -0,0 +1,46 @@
+import asyncio
+
+from domain.gateways.chatbot_gateway import ChatbotGateway
+from infrastructure.chatbot.pooled_chatbot import PooledChatbot
+
+
+class FlakyChatbot(ChatbotGateway):
+    """Falha na primeira chamada e depois responde devagar."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    async def generate_response(self, user_id, user_input, history, context=None):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("fora do ar")
+        await asyncio.sleep(self.delay)
+        return "lento"
+
+
+class FastChatbot(ChatbotGateway):
+    async def generate_response(self, user_id, user_input, history, context=None):
+        return "rápido"
+
+
+def test_cancelled_probe_reopens_the_circuit():
+    async def run():
+        slow = FlakyChatbot(delay=0.5)
+        pool = PooledChatbot(
+            [("slow", slow), ("fast", FastChatbot())],
+            max_consecutive_failures=1, open_seconds=0.05, hedge_after=0.01, explore_rate=0.0,
+        )
+        # A falha abre o circuito do "slow"; o failover responde
+        assert await pool.generate_response(1, "oi", []) == "rápido"
+        await asyncio.sleep(0.06)
+        # Half-open: a chamada de teste vai no "slow", perde o hedging e é cancelada
+        assert await pool.generate_response(1, "oi", []) == "rápido"
+        await asyncio.sleep(0)
+        return slow.calls, [backend.name for backend in pool._route()], pool.get_stats()
+
+    calls, order, stats = asyncio.run(run())
+    assert calls == 2
+    # O teste não foi conclusivo: o circuito volta a abrir e o "slow" fica fora da rotação
+    assert order == ["fast"]
+    assert stats["slow_circuit_open"] == 1
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("telegram")
+
+from telegram.error import RetryAfter
+
+from infrastructure.telegram.send_rate_limiter import PRIORITY_LOW, SendRateLimiter
+
+
+def test_retry_after_pauses_the_chat_even_without_retry():
+    async def run():
+        limiter = SendRateLimiter()
+
+        async def flooded(*args, **kwargs):
+            raise RetryAfter(30)
+
+        with pytest.raises(RetryAfter):
+            # Edição intermediária do streaming: não é repetida
+            await limiter.process_request(
+                flooded, (), {}, "editMessageText", {"chat_id": 42},
+                {"priority": PRIORITY_LOW, "max_retries": 0}
+            )
+        return limiter.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["paused_chats"] == 1
+    assert stats["retries"] == 0
@@ -0,0 +1,48 @@
+import asyncio
+
+from domain.gateways.chatbot_gateway import ChatbotGateway
+from infrastructure.chatbot.single_flight_chatbot import SingleFlightChatbot
+
+
+class SlowHistoryChatbot(ChatbotGateway):
+    """Demora um pouco e responde citando a primeira pergunta do histórico."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_response(self, user_id, user_input, history, context=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return f"resposta ({history[0][0]})"
+
+
+SAME_BUTTONS = [("Próximos jogos", "agenda"), ("Jogadores", "elenco")]
+
+
+def _ask_together(first_history, second_history):
+    async def run():
+        inner = SlowHistoryChatbot()
+        chatbot = SingleFlightChatbot(inner)
+        answers = await asyncio.gather(
+            chatbot.generate_response(1, "e o que ele acha disso?", first_history),
+            chatbot.generate_response(2, "e o que ele acha disso?", second_history),
+        )
+        return answers, inner.calls
+
+    return asyncio.run(run())
+
+
+def test_older_turns_are_part_of_the_key():
+    answers, calls = _ask_together(
+        [("quem é o yuurih?", "jogador")] + SAME_BUTTONS,
+        [("quem é o fallen?", "jogador")] + SAME_BUTTONS,
+    )
+    assert calls == 2
+    assert answers == ["resposta (quem é o yuurih?)", "resposta (quem é o fallen?)"]
+
+
+def test_identical_conversations_share_the_call():
+    history = [("quem é o yuurih?", "jogador")] + SAME_BUTTONS
+    answers, calls = _ask_together(history, list(history))
+    assert calls == 1
+    assert answers[0] == answers[1]
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+
+from infrastructure.memory.sqlite_user_memory import SqliteUserMemory, _Shard
+
+
+def test_instances_sharing_a_directory_see_each_others_history(tmp_path):
+    async def run():
+        first = SqliteUserMemory(str(tmp_path), shards=2)
+        second = SqliteUserMemory(str(tmp_path), shards=2)
+        await first.add_interaction(7, "oi", "olá!")
+        assert await second.get_history(7) == [] # Ainda na fila write-behind da primeira
+        await first.close()
+
+        assert await second.get_history(7) == [("oi", "olá!")]
+        # A segunda instância grava; uma nova leitura na terceira vê as duas interações
+        await second.add_interaction(7, "e aí?", "tudo certo")
+        await second.close()
+        third = SqliteUserMemory(str(tmp_path), shards=2)
+        history = await third.get_history(7)
+        await third.close()
+        return history
+
+    assert asyncio.run(run()) == [("oi", "olá!"), ("e aí?", "tudo certo")]
+
+
+def test_close_waits_for_a_write_in_progress(tmp_path, monkeypatch):
+    writing = threading.Event()
+    original_write = _Shard.write
+
+    def slow_write(self, batch, max_history_size):
+        writing.set()
+        time.sleep(0.1)
+        original_write(self, batch, max_history_size)
+
+    monkeypatch.setattr(_Shard, "write", slow_write)
+
+    async def run():
+        memory = SqliteUserMemory(str(tmp_path), shards=1, flush_interval=0.01)
+        await memory.start()
+        await memory.add_interaction(7, "oi", "olá!")
+        await asyncio.to_thread(writing.wait, 1)
+        # O flush periódico está no meio da gravação quando a memória é fechada
+        await memory.close()
+
+        reopened = SqliteUserMemory(str(tmp_path), shards=1)
+        history = await reopened.get_history(7)
+        await reopened.close()
+        return history
+
+    assert asyncio.run(run()) == [("oi", "olá!")]
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from benchmarks.fake_llm import FakeMessage
+from domain.gateways.chatbot_gateway import StreamInterruptedError
+from domain.use_cases.process_user_message import ProcessUserMessageUseCase
+from infrastructure.chatbot.cached_chatbot import CachedChatbot
+from infrastructure.chatbot.langchain_chatbot import LangchainChatbot
+from infrastructure.chatbot.scheduled_chatbot import ScheduledChatbot
+from infrastructure.memory.in_memory_user_memory import InMemoryUserMemory
+from infrastructure.scheduler.llm_scheduler import LLMScheduler
+
+
+class BrokenStreamLLM:
+    """Entrega alguns pedaços e falha no meio do streaming (a primeira vez)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        return FakeMessage("resumo")
+
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        for word in ("A ", "FURIA ", "joga "):
+            yield FakeMessage(word)
+        if self.calls == 1:
+            raise RuntimeError("conexão caiu")
+        yield FakeMessage("amanhã.")
+
+
+def _build(llm):
+    scheduler = LLMScheduler(max_in_flight=2, max_queue_size=10, default_timeout=5)
+    gateway = CachedChatbot(ScheduledChatbot(LangchainChatbot(llm=llm), scheduler))
+    memory = InMemoryUserMemory(max_history_size=10)
+    return ProcessUserMessageUseCase(chatbot_gateway=gateway, memory_gateway=memory), memory
+
+
+async def _consume(use_case, user_id, text):
+    chunks = []
+    async for chunk in use_case.execute_stream(user_id, text):
+        chunks.append(chunk)
+    return "".join(chunks)
+
+
+def test_interrupted_stream_is_neither_cached_nor_saved():
+    async def run():
+        llm = BrokenStreamLLM()
+        use_case, memory = _build(llm)
+        question = "quando é a próxima partida contra a navi"
+        with pytest.raises(StreamInterruptedError):
+            await _consume(use_case, 1, question)
+        history = await memory.get_history(1)
+        # Outro usuário pergunta o mesmo: o LLM é chamado de novo e a resposta vem completa
+        second = await _consume(use_case, 2, question)
+        return history, second, llm.calls
+
+    history, second, calls = asyncio.run(run())
+    assert history == []
+    assert second == "A FURIA joga amanhã."
+    assert calls == 2
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("telegram")
+pytest.importorskip("langchain")
+
+from telegram import Update
+
+from app.telegram_bot import build_application
+from benchmarks.fake_llm import FakeChatModel
+from config import settings
+from config.settings import Settings
+
+GENERIC_ERRORS = (settings.UNEXPECTED_ERROR_MESSAGE, settings.INTERNAL_ERROR_MESSAGE)
+
+
+def make_update(update_id, text, bot):
+    user = {"id": 42, "is_bot": False, "first_name": "Fã"}
+    message = {"message_id": update_id, "date": int(time.time()), "chat": {"id": 42, "type": "private"}, "from": user, "text": text}
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return Update.de_json({"update_id": update_id, "message": message}, bot)
+
+
+def test_start_and_streamed_reply_work_offline(monkeypatch):
+    # Edita a cada pedaço, para passar pelas edições intermediárias (baixa prioridade)
+    monkeypatch.setattr(settings, "STREAM_EDIT_INTERVAL_SECONDS", 0.0)
+
+    async def run():
+        llm = FakeChatModel(latency_median=0.05, latency_sigma=0.0, response_words=20, seed=1)
+        application = build_application(llm=llm, offline=True, with_metrics_server=False, config=Settings())
+        async with application:
+            await application.post_init(application)
+            for update_id, text in enumerate(["/start", "o que você achou do último mapa do yuurih?"], start=1):
+                await application.process_update(make_update(update_id, text, application.bot))
+            await application.post_shutdown(application)
+            return list(application.bot.request.calls)
+
+    calls = asyncio.run(run())
+    texts = [parameters.get("text", "") for method, parameters, _ in calls if method in ("sendMessage", "editMessageText")]
+    methods = [method for method, _, _ in calls]
+    assert any(text.startswith("Olá, Fã!") for text in texts)
+    assert "editMessageText" in methods
+    assert texts[-1].startswith("FURIA 🐾")
+    assert not any(text in GENERIC_ERRORS for text in texts)
+
+
+def test_start_forgets_the_conversation_summary():
+    async def run():
+        llm = FakeChatModel(latency_median=0.0, seed=1)
+        application = build_application(llm=llm, offline=True, with_metrics_server=False, config=Settings())
+        compactor = application.bot_data["history_compactor"]
+        async with application:
+            await application.post_init(application)
+            # Resumo de uma conversa anterior do usuário 42
+            compactor.compact(42, [("pergunta antiga", "resposta antiga")])
+            compactor._states[42].summary = "resumo antigo"
+            await application.process_update(make_update(1, "/start", application.bot))
+            summary, _ = compactor.compact(42, [("Próximos jogos", "agenda da furia")])
+            await application.post_shutdown(application)
+            return summary
+
+    assert asyncio.run(run()) == ""
@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("telegram")
+pytest.importorskip("langchain")
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.telegram_bot import build_application
+from benchmarks.fake_llm import FakeChatModel
+from config.settings import Settings
+from infrastructure.telegram.webhook_server import WebhookServer
+
+
+@pytest.mark.parametrize("body", ["5", "[1, 2]", "\"texto\"", "{não é json"])
+def test_invalid_body_is_a_bad_request(body):
+    async def run():
+        application = build_application(
+            llm=FakeChatModel(latency_median=0.0), offline=True, with_metrics_server=False, config=Settings()
+        )
+        server = WebhookServer(application)
+        async with TestClient(TestServer(server.web_app)) as client:
+            response = await client.post("/telegram", data=body, headers={"Content-Type": "application/json"})
+            return response.status, application.update_queue.qsize()
+
+    assert asyncio.run(run()) == (400, 0)